@@ -0,0 +1,258 @@
+import os
+import time
+import configparser
+
+from functions import wait_engine
+
+# Selenium is imported inside the functions that use it, so importing the
+# scraper modules stays cheap until a browser is actually needed.
+
+# Shared driver created on first use by get_driver()
+_driver = None
+
+
+def get_driver():
+
+    """
+    Returns the shared browser, starting Chrome and opening the listing on first use.
+    Nothing is launched when the scraper modules are merely imported; the
+    browser only starts when a scrape stage asks for it.
+    Returns:
+        WebDriver: The shared Chrome driver showing the DGFT order listing.
+    Raises:
+        Exception: "Website not opened correctly" if Chrome or the listing fails to open.
+    """
+
+    global _driver
+    if _driver is None:
+        from selenium.common.exceptions import WebDriverException
+
+        try:
+            driver = create_driver()
+        except WebDriverException as e:
+            raise Exception("Website not opened correctly") from e
+        open_listing(driver)
+        _driver = driver
+    return _driver
+
+
+def quit_driver():
+
+    """Closes the shared browser if one was started."""
+
+    global _driver
+    if _driver is not None:
+        _driver.quit()
+        _driver = None
+
+
+def create_driver():
+
+    """
+    Starts a headless Chrome WebDriver with the options the scraper needs.
+    Returns:
+        WebDriver: A new Chrome driver.
+    """
+
+    from selenium import webdriver
+
+    chrome_options = webdriver.ChromeOptions()
+
+    # Enable headless mode
+    chrome_options.add_argument("--headless=new")  # Use new headless mode for better compatibility
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--window-size=1920,1080")  # Set window size to avoid hidden elements
+
+    # service = Service(chrome_driver_path)
+    return webdriver.Chrome(options=chrome_options)
+
+
+def open_listing(driver):
+
+    """
+    Opens the DGFT order listing in `driver` and waits until the page has loaded.
+    Raises:
+        Exception: "Website not opened correctly" if the page cannot be opened.
+    """
+
+    from selenium.common.exceptions import TimeoutException, WebDriverException, NoSuchElementException
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    try:
+        driver.get(config['url']['dgft_url'])
+        driver.maximize_window()
+        wait_engine.wait_for_document_ready(driver)
+    except(TimeoutException, WebDriverException, NoSuchElementException) as e:
+        raise Exception("Website not opened correctly") from e
+
+
+def handle_security_warning(driver, page):
+
+    """
+    Recovers from DGFT's `j_spring_security_logout` redirect.
+    Clears cookies, reopens the listing, restores the configured page length
+    and draws `page` again.
+    Args:
+        driver (WebDriver): The driver to check.
+        page (int): The 1-based page the scrape was on.
+    """
+
+    try:
+        if "j_spring_security_logout" in driver.current_url:
+            print("Security warning detected! Refreshing page...")
+            config = configparser.ConfigParser()
+            config.read('config.ini')
+
+            driver.delete_all_cookies()
+            driver.get(config['url']['dgft_url'])
+            wait_engine.wait_for_document_ready(driver)
+            wait_engine.wait_for_table_ready(driver)
+            # A reload resets the page length, so restore it before jumping back
+            set_page_length(driver, config.get('scraper', 'page_length', fallback='max'))
+            zero_indexed_page = page - 1
+            wait_engine.draw_page_and_wait(driver, zero_indexed_page)
+    except Exception as e:
+        print(f"Error handling security warning: {e}")
+        raise e
+
+
+def set_page_length(driver, page_length="max"):
+
+    """
+    Sets the metaTable page length before paging, so fewer and larger pages are drawn.
+    Args:
+        driver (WebDriver): The driver showing the listing.
+        page_length (str): "max" picks the largest numeric option offered by the
+            page-length selector, "all" uses DataTables' -1 (all rows) when the
+            selector offers it and otherwise behaves like "max", and a number sets
+            that length directly. "default" leaves the site's setting untouched.
+    Returns:
+        int: The page length in effect afterwards (-1 means all rows on one page).
+    """
+
+    if page_length == "default":
+        return driver.execute_script("return $('#metaTable').DataTable().page.len();")
+
+    length = driver.execute_script("""
+        var wanted = arguments[0];
+        var options = $('#metaTable_length select option').map(function () {
+            return parseInt($(this).val(), 10);
+        }).get().filter(function (v) { return !isNaN(v); });
+        if (wanted === 'all' && options.indexOf(-1) !== -1) {
+            return -1;
+        }
+        if (wanted === 'max' || wanted === 'all') {
+            var positive = options.filter(function (v) { return v > 0; });
+            return positive.length ? Math.max.apply(null, positive) : null;
+        }
+        return parseInt(wanted, 10);
+    """, page_length)
+
+    if not length:
+        print("Page length selector not found, keeping default page length")
+        return driver.execute_script("return $('#metaTable').DataTable().page.len();")
+
+    driver.execute_script("$('#metaTable').DataTable().page.len(arguments[0]).draw(false);", length)
+    wait_engine.wait_for_table_ready(driver)
+    print(f"metaTable page length set to {length}")
+    return length
+
+
+def get_listing_shape(driver):
+
+    """
+    Describes the current shape of the listing, used to decide whether a crawl
+    checkpoint still applies.
+    Returns:
+        dict: "pages", "page_length" and "records_total" from `DataTable().page.info()`,
+              and the current "order" of the table.
+    """
+
+    info = driver.execute_script("return $('#metaTable').DataTable().page.info();")
+    order = driver.execute_script("return $('#metaTable').DataTable().order();")
+    return {
+        "pages": int(info["pages"]),
+        "page_length": int(info["length"]),
+        "records_total": int(info["recordsTotal"]),
+        "order": [list(column) for column in order],
+    }
+
+
+def get_total_pages(driver):
+
+    """
+    Returns the number of metaTable pages at the current page length.
+    The count is read from `DataTable().page.info()`; the paginator XPath in
+    `[xpaths] page_count` is only used if the DataTables API is unavailable.
+    Returns:
+        int: Total number of pages.
+    """
+
+    try:
+        return get_listing_shape(driver)["pages"]
+    except Exception as e:
+        print(f"page.info() unavailable, reading page count from paginator: {e}")
+        from selenium.webdriver.common.by import By
+
+        config = configparser.ConfigParser()
+        config.read('config.ini')
+        page_count = driver.find_element(By.XPATH, config['xpaths']['page_count'])
+        return int(page_count.text)
+
+
+def scrape_page(driver, page, html_parser="lxml", record_pages_path=""):
+
+    """
+    Draws one metaTable page and returns its rows.
+    The draw is retried up to three times, the security logout is handled, and
+    only the table's outerHTML is parsed.
+    Args:
+        driver (WebDriver): The driver showing the listing.
+        page (int): 1-based page number.
+        html_parser (str): Parser passed to `table_parser.parse_table_html`.
+        record_pages_path (str): When set, the page source is saved there too.
+    Returns:
+        tuple: (headers, table_data) of the page.
+    Raises:
+        Exception: If the page is still not drawn after the last attempt.
+    """
+
+    from selenium.webdriver.common.by import By
+    from functions import table_parser
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    zero_indexed_page = page - 1  # Convert to DataTables page index (0-based)
+
+    max_retries = 3  # Maximum number of retries for JavaScript execution
+    retry_delay = wait_engine.get_timeout('retry_delay', 1)
+    for attempt in range(max_retries):
+        try:
+            if attempt:
+                # A logout redirect makes the draw fail; recover from it before drawing again
+                handle_security_warning(driver, page)
+            # Draw the desired page and wait for DataTables' draw event
+            wait_engine.draw_page_and_wait(driver, zero_indexed_page)
+            break  # Success
+        except Exception as e:
+            print(f"Attempt {attempt + 1} failed: {e}")
+            if attempt + 1 == max_retries:
+                # Parsing whatever page is showing would spool it as this page
+                raise Exception(f"Page {page} could not be drawn after {max_retries} attempts") from e
+            time.sleep(retry_delay * (attempt + 1))
+
+    print(f"Successfully jumped to page {page} using JavaScript")
+    handle_security_warning(driver, page)  # Check for security warning
+
+    # Serialise only the metaTable element instead of the whole page source
+    table_html = driver.find_element(By.XPATH, config['xpaths']['table_xpath'].strip()).get_attribute("outerHTML")
+    if record_pages_path:
+        with open(os.path.join(record_pages_path, f"page_{page:05d}.html"), "w", encoding="utf-8") as f:
+            f.write(driver.page_source)
+
+    return table_parser.parse_table_html(table_html, html_parser)
@@ -0,0 +1,107 @@
+import configparser
+from concurrent.futures import ThreadPoolExecutor
+
+from functions import browser, wait_engine, crawl_checkpoint
+
+
+def split_page_ranges(total_page, workers):
+
+    """
+    Splits pages 1..total_page into at most `workers` contiguous ranges.
+    Returns:
+        list: (first_page, last_page) tuples in page order.
+    Example:
+        >>> split_page_ranges(10, 3)
+        [(1, 4), (5, 7), (8, 10)]
+    """
+
+    if total_page <= 0:
+        return []
+    workers = max(1, min(workers, total_page))
+    size, extra = divmod(total_page, workers)
+    ranges = []
+    first_page = 1
+    for worker in range(workers):
+        last_page = first_page + size - 1 + (1 if worker < extra else 0)
+        ranges.append((first_page, last_page))
+        first_page = last_page + 1
+    return ranges
+
+
+def scrape_page_range(first_page, last_page, page_length="max", html_parser="lxml"):
+
+    """
+    Scrapes a contiguous range of metaTable pages in a browser of its own.
+    The worker opens the listing, applies the page length, and recovers from the
+    security logout on its own driver, then quits the browser.
+    Args:
+        first_page (int): First 1-based page of the range.
+        last_page (int): Last 1-based page of the range (inclusive).
+        page_length (str): Page length setting passed to `browser.set_page_length`.
+        html_parser (str): Parser used for the table HTML.
+    Returns:
+        list: (page, headers, table_data) for every page of the range, in page order.
+    """
+
+    print(f"Browser worker starting on pages {first_page}-{last_page}")
+    driver = browser.create_driver()
+    try:
+        browser.open_listing(driver)
+        wait_engine.wait_for_table_ready(driver)
+        browser.set_page_length(driver, page_length)
+
+        pages = []
+        for page in range(first_page, last_page + 1):
+            headers, table_data = browser.scrape_page(driver, page, html_parser)
+            pages.append((page, headers, table_data))
+        print(f"Browser worker finished pages {first_page}-{last_page}")
+        return pages
+    finally:
+        driver.quit()
+
+
+def scrape_pages_in_parallel(total_page, sink, first_page=1, spool_name=None, listing_shape=None):
+
+    """
+    Shards pages first_page..total_page across a pool of headless browsers.
+    Every worker takes a contiguous range of pages; results are appended to
+    `sink` strictly in page order as soon as each range, and all ranges before
+    it, are done. The pool size comes from `[browser_pool] workers` and is capped
+    by `max_concurrency` to stay polite to dgft.gov.in. The shared browser that
+    read the page count is closed first, so it does not count against the cap.
+    Args:
+        total_page (int): Number of pages at the configured page length.
+        sink (RowSink): Spool the rows are appended to.
+        first_page (int): First page to scrape.
+        spool_name (str, optional): When given, a crawl checkpoint is saved after every page.
+        listing_shape (dict, optional): Listing shape recorded in the checkpoint.
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    workers = min(config.getint('browser_pool', 'workers', fallback=1),
+                  config.getint('browser_pool', 'max_concurrency', fallback=3))
+    page_length = config.get('scraper', 'page_length', fallback='max')
+    html_parser = config.get('scraper', 'html_parser', fallback='lxml')
+
+    page_count = total_page - first_page + 1
+    if page_count <= 0:
+        # Nothing left to scrape (e.g. a resumed crawl that had already finished)
+        print(f"No pages to scrape from page {first_page} of {total_page}")
+        return
+
+    ranges = [(first + first_page - 1, last + first_page - 1)
+              for first, last in split_page_ranges(page_count, workers)]
+    print(f"Scraping {page_count} pages with {len(ranges)} browser workers: {ranges}")
+    browser.quit_driver()
+
+    with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+        futures = [executor.submit(scrape_page_range, first, last, page_length, html_parser)
+                   for first, last in ranges]
+        # Waiting on the futures in submission order merges the ranges in page order
+        for future in futures:
+            for page, headers, table_data in future.result():
+                sink.write_page(page, headers, table_data)
+                if spool_name:
+                    crawl_checkpoint.save_checkpoint(spool_name, sink, page, total_page, listing_shape)
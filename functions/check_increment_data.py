@@ -1,35 +1,41 @@
 import os
 import sys
 import traceback
-import pandas as pd
-from datetime import datetime
-from functions import  log, send_mail, download_pdf, db_connection
+from functions import  log, send_mail, download_pdf, db_connection, order_keys, deleted_orders, updated_orders, snapshot, memory_budget, order_schema
 import configparser
 import log_details
 
 
 
-def check_increment_data(excel_path):
+def check_increment_data(excel_data):
 
     """
-    Compares data from an Excel file extracted data from website with data from a database table to identify new and deleted records.
+    Compares data extracted from website with data from a database table to identify new and deleted records.
     This function performs the following steps:
-    1. Reads data from a database table and an Excel file stored with all records from website.
-    2. Cleans and standardizes column names for both datasets.
-    3. Identifies new records in the Excel file that are not present in the database.
-    4. Identifies deleted records in the database that are not present in the Excel file.
-    5. Logs the results and saves the new and deleted records to separate Excel files.
+    1. Reads the key fingerprints from the database table and takes all records from website
+       (the scraper's DataFrame, or an archived snapshot path when rerun by hand).
+    2. Cleans and standardizes the Excel column names and fingerprints each row's composite key.
+    3. Identifies new records in the Excel file whose fingerprint is not present in the database.
+    4. Identifies deleted records in the database that are not present in the Excel file and
+       marks them removed in batched UPDATEs (see `deleted_orders`), unless the scrape looks truncated.
+       Existing records whose content fingerprint changed are updated in place (see `updated_orders`).
+    5. Logs the results, hands the new records to `download_pdf` in memory and saves them
+       as an incremental snapshot (`[snapshots]` in config.ini).
     6. Updates a log table with the status of the operation.
     7. Sends an email notification in case of errors.
 
+    Args:
+        excel_data (pd.DataFrame | str): All rows scraped from the website, or a snapshot path.
     Raises:
         Exception: If any error occurs during the execution, the exception details are logged, 
                 an email is sent, and the program exits.
     Notes:
         - The function uses configurations and utilities from the `log_details` module.
         - The function assumes specific column names ('order_type', 'order_no', 'name_of_party', 
-        'ra_file_no',) for comparison between the database and Excel data.
-        - The function saves new data to an incremental Excel file and deleted data to a separate file.
+        'ra_file_no',) for comparison between the database and Excel data. Their normalised
+        values are hashed into `key_hash` (see `order_keys`), an indexed column in MySQL, so
+        only the fingerprints are fetched from the database instead of `SELECT *`.
+        - The function saves new data to an incremental snapshot; deleted orders are marked in the database.
         - If no new data is found, the function logs a success message and exits.
         - If deleted data is found but no new data exists, the function logs the deleted count and exits.
     """
@@ -40,89 +46,77 @@ def check_increment_data(excel_path):
         config = configparser.ConfigParser()
         config.read('config.ini')
        
+        # In chunked mode (`[memory] chunked`) new rows are spooled instead of kept in memory
+        chunk_rows = memory_budget.get_chunk_rows()
+        spool_path = os.path.join(config.get('spool', 'spool_path', fallback=os.path.join('data', 'spool')), "new_data.parquet")
+        new_data = snapshot.FrameBuffer(spool_path if chunk_rows else None)
+        update_candidates = snapshot.FrameBuffer()
+        scraped_hashes = set()
+        seen_rows = set()
+
         with db_connection.db_connection() as connection:
-            query = f"SELECT * FROM {config['general']['table_name']}"
-            database_df = pd.read_sql(query, con=connection)
-         # Filter out records with removal_date
-        database_df.drop(columns=['source_name',  'updated_date', 'date_scraped'])
-       
-        excel_df = pd.read_excel(excel_path)
-        excel_df = excel_df.drop_duplicates()
-    
-        excel_df.columns = excel_df.columns.str.strip().str.lower().str.replace(' ', '_').str.replace('.', '')
+            order_keys.ensure_key_hash_column(connection)
+            database_hashes = order_keys.fetch_key_hashes(connection)
+            content_hashes = updated_orders.load_content_hashes(connection)
+            print("database keys", len(database_hashes))
 
-        print("database columns", database_df.columns)
-        print("excel columns", excel_df.columns)
+            for excel_df in snapshot.iter_frames(excel_data, chunk_rows):
+                excel_df = excel_df.drop_duplicates()
 
+                order_keys.normalise_columns(excel_df)
+                order_schema.apply_schema(excel_df)
+                excel_df['key_hash'] = order_keys.key_fingerprint(excel_df)
+                excel_df['content_hash'] = order_keys.content_fingerprint(excel_df)
 
-        if not database_df.empty:
-            new_data = excel_df.merge(database_df[['order_type', 'order_no','name_of_party', 'ra_file_no']], on=['order_type', 'order_no','name_of_party', 'ra_file_no'], how='left', indicator=True).query('_merge == "left_only"').drop(columns=['_merge'])
-        else:
-            new_data = excel_df
+                # Rows repeated across chunks are only handled once
+                pairs = list(zip(excel_df['key_hash'], excel_df['content_hash']))
+                excel_df = excel_df[[pair not in seen_rows for pair in pairs]]
+                seen_rows.update(pairs)
+                scraped_hashes.update(excel_df['key_hash'])
+                print("Excel DataFrame shape:", excel_df.shape)
 
-        # Find deleted data
-        # deleted_data = database_df.merge(excel_df[['order_type', 'order_no','name_of_party', 'ra_file_no']], on=['order_type', 'order_no','name_of_party', 'ra_file_no'], how="left", indicator=True).query('_merge == "left_only"').drop(columns=['_merge'])
-        # deleted_data_df = pd.DataFrame(deleted_data)
-        # deleted_data_df.to_excel("deleted_data.xlsx", index=False)
-        
-        new_data_df = pd.DataFrame(new_data)
-        new_data_df.to_excel("new_data_today_123.xlsx", index=False)
-        # Add diagnostic prints
-        print("\nafter dropping columns:")
-        print("Database DataFrame shape:", database_df.shape)
-        print("Excel DataFrame shape:", excel_df.shape)
-
-         # Safely compare values
-        print("\nSample values comparison:")
-        common_cols = set(database_df.columns) & set(excel_df.columns)
-        for col in common_cols:
-            print(f"\nColumn: {col}")
-            db_value = repr(database_df[col].iloc[0]) if not database_df.empty else "No data"
-            excel_value = repr(excel_df[col].iloc[0]) if not excel_df.empty else "No data"
-            print("Database first value:", db_value)
-            print("Excel first value:", excel_value)
-        
-        database_df.columns = database_df.columns.str.strip().str.lower()
-        excel_df.columns = excel_df.columns.str.strip().str.lower()
+                # Set membership on the key fingerprints instead of merging full frames
+                new_data.write(excel_df[~excel_df['key_hash'].isin(database_hashes)])
 
-        # Print the missing rows in database and Excel
-        print("Rows in Excel but not in database (New Data):\n")
-        print(new_data)
+                # Existing orders whose details may have changed; applied once every chunk is seen
+                update_candidates.write(updated_orders.find_update_candidates(excel_df, content_hashes))
+
+            # Find updated data: existing orders whose details changed on the website
+            updated_orders.detect_updated_orders(connection, update_candidates.frames(), content_hashes, seen_rows)
 
-        # print(f"Rows in database but not in excel (Deleted Data):   {len(deleted_data)}")
+            # Find deleted data: active orders whose key is no longer on the website
+            deleted_orders.detect_deleted_orders(connection, scraped_hashes)
+        memory_budget.record_stage("diff")
 
-        log_details.no_data_avaliable = len(new_data)
-        # log_details.deleted_source_count = len(deleted_data)
+        # Print the missing rows in database and Excel
+        print("Rows in Excel but not in database (New Data):", new_data.rows)
+
+        log_details.no_data_avaliable = new_data.rows
          
-        print( "missing rows in database", len(new_data))
+        print( "missing rows in database", new_data.rows)
 
-        if  log_details.deleted_source_count > 0 and len(new_data) == 0:
+        if  (log_details.deleted_source_count > 0 or log_details.updated_count > 0) and new_data.rows == 0:
             log_details.log_list[1] = "Success"
-            log_details.log_list[3] = f"{log_details.deleted_source_count} data are deleted in the website"
+            log_details.log_list[3] = f"{log_details.deleted_source_count} data are deleted and {log_details.updated_count} data are updated in the website"
             log.insert_log_into_table(log_details.log_list)
             print("log table in check increment when deleted count presents====", log_details.log_list)
             log_details.log_list = [None] * 8
+            memory_budget.print_memory_summary()
     
             sys.exit()
         
-        if len(new_data) == 0:
+        if new_data.rows == 0:
             log_details.log_list[1] = "Success"
            
             log_details.log_list[3] = "no new data"
             log.insert_log_into_table(log_details.log_list)
             print("log table====", log_details.log_list)
             log_details.log_list = [None] *8
+            memory_budget.print_memory_summary()
             sys.exit()
   
-        current_date = datetime.now().strftime("%Y-%m-%d")
-        increment_file_name = f"incremental_excel_sheet_{current_date}.xlsx"
-        increment_data_excel_path = os.path.join(config['file_paths']['increment_data_excel_path'], increment_file_name)   
-        
-        # Save to Excel file
-        new_data_df = pd.DataFrame(new_data)
-        new_data_df.to_excel(increment_data_excel_path, index=False)
-        print(f"New data saved to {increment_data_excel_path}")
-        download_pdf.download_pdf(increment_data_excel_path)
+        new_data_frames = snapshot.iter_frames(new_data.frames(), chunk_rows)
+        download_pdf.download_pdf(snapshot.tee_snapshot(new_data_frames, 'increment_data_excel_path', 'incremental_excel_sheet'))
 
     except Exception as e:
             traceback.print_exc()
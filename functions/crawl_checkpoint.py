@@ -0,0 +1,107 @@
+import os
+import json
+import configparser
+from datetime import datetime
+
+
+def get_checkpoint_path():
+
+    """Returns the checkpoint file path from `[checkpoint] checkpoint_path` in config.ini."""
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    return config.get('checkpoint', 'checkpoint_path', fallback=os.path.join('data', 'spool', 'crawl_checkpoint.json'))
+
+
+def load_checkpoint():
+
+    """
+    Loads the crawl checkpoint left by an interrupted run.
+    Returns:
+        dict: The checkpoint, or None when there is none (or it is unreadable).
+    """
+
+    checkpoint_path = get_checkpoint_path()
+    if not os.path.exists(checkpoint_path):
+        return None
+    try:
+        with open(checkpoint_path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        print(f"Found crawl checkpoint: page {checkpoint['last_page']} of {checkpoint['total_page']}, "
+              f"{checkpoint['rows_spooled']} rows spooled")
+        return checkpoint
+    except Exception as e:
+        print(f"Ignoring unreadable crawl checkpoint {checkpoint_path}: {e}")
+        return None
+
+
+def save_checkpoint(spool_name, sink, last_page, total_page, listing_shape):
+
+    """
+    Records that every page up to `last_page` has been spooled.
+    The file is written to a temporary path and renamed, so a crash never leaves
+    a half-written checkpoint behind.
+    Args:
+        spool_name (str): Name of the spool the rows were written to.
+        sink (RowSink): The spool, for its directory and row count.
+        last_page (int): Last page fully written to the spool.
+        total_page (int): Page count reported by the listing.
+        listing_shape (dict): Listing shape from `browser.get_listing_shape`.
+    """
+
+    checkpoint_path = get_checkpoint_path()
+    os.makedirs(os.path.dirname(checkpoint_path) or ".", exist_ok=True)
+
+    checkpoint = {
+        "spool_name": spool_name,
+        "spool_dir": sink.spool_dir,
+        "last_page": last_page,
+        "rows_spooled": sink.rows_written,
+        "total_page": total_page,
+        "listing_shape": listing_shape,
+        "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    temp_path = f"{checkpoint_path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(temp_path, checkpoint_path)
+
+
+def get_resume_page(checkpoint, listing_shape, sink):
+
+    """
+    Decides which page an interrupted crawl can continue from.
+    A crawl is only resumed when the listing has the same shape as when the
+    checkpoint was written (same page count, page length and record total) and
+    the spool still holds exactly the rows the checkpoint recorded. Otherwise the
+    spool is reset and the crawl starts again at page 1.
+    Args:
+        checkpoint (dict): The loaded checkpoint, or None.
+        listing_shape (dict): The current listing shape.
+        sink (RowSink): The spool opened for the checkpoint.
+    Returns:
+        int: The first page to scrape.
+    """
+
+    if not checkpoint:
+        return 1
+
+    if checkpoint["listing_shape"] != listing_shape:
+        print(f"Listing changed shape since checkpoint ({checkpoint['listing_shape']} -> {listing_shape}), restarting at page 1")
+    elif checkpoint["spool_dir"] != sink.spool_dir or checkpoint["rows_spooled"] != sink.rows_written:
+        print("Spool does not match checkpoint, restarting at page 1")
+    else:
+        print(f"Resuming crawl at page {checkpoint['last_page'] + 1}")
+        return checkpoint["last_page"] + 1
+
+    sink.reset()
+    return 1
+
+
+def clear_checkpoint():
+
+    """Removes the checkpoint once the crawl has been written to its snapshot."""
+
+    checkpoint_path = get_checkpoint_path()
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
@@ -1,9 +1,4 @@
-from selenium import webdriver
-from datetime import datetime
-import mysql.connector
 import configparser
-import os
-import sys
 
 
 def db_connection():
@@ -26,6 +21,9 @@ def db_connection():
     """
 
     try:
+        # Imported here so that runs which never touch the database start quickly
+        import mysql.connector
+
         config = configparser.ConfigParser()
         if not config.read('config.ini'):
             raise Exception("Could not read config.ini file")
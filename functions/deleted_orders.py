@@ -0,0 +1,192 @@
+import configparser
+from datetime import datetime
+
+from functions import order_keys
+import log_details
+
+
+def find_deleted_hashes(scraped_hashes, active_hashes):
+
+    """
+    Anti-joins the database keys against the scraped keys.
+    Args:
+        scraped_hashes (set): Key fingerprints seen on the website in this run.
+        active_hashes (set): Fingerprints of orders in the database not yet marked removed.
+    Returns:
+        set: Fingerprints of orders that have disappeared from the website.
+    """
+
+    return active_hashes - scraped_hashes
+
+
+def check_deletion_is_safe(scraped_count, active_count, deleted_count):
+
+    """
+    Refuses to mark orders removed when the scrape is obviously truncated.
+    Deletions are only applied after a full crawl, when the scrape returned at
+    least `[deletions] min_scraped_ratio` of the active orders, and when no more
+    than `max_deleted_fraction` of them would be removed at once.
+    Args:
+        scraped_count (int): Distinct keys scraped in this run.
+        active_count (int): Active orders in the database.
+        deleted_count (int): Orders the anti-join would mark removed.
+    Returns:
+        str: The reason deletion is refused, or None when it is safe.
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    if not log_details.full_crawl:
+        return "incremental crawl stopped early, the listing was not fully scraped"
+    if active_count == 0 or deleted_count == 0:
+        return None
+
+    min_scraped_ratio = config.getfloat('deletions', 'min_scraped_ratio', fallback=0.9)
+    if scraped_count < active_count * min_scraped_ratio:
+        return f"scraped {scraped_count} orders but the database holds {active_count} active orders"
+
+    max_deleted_fraction = config.getfloat('deletions', 'max_deleted_fraction', fallback=0.05)
+    if deleted_count > active_count * max_deleted_fraction:
+        return f"{deleted_count} of {active_count} orders would be removed (limit {max_deleted_fraction:.0%})"
+    return None
+
+
+def mark_orders_removed(connection, deleted_hashes, removal_date=None, batch_size=1000):
+
+    """
+    Soft-deletes orders by setting `removal_date`, in batched UPDATEs inside one transaction.
+    Args:
+        connection: An open MySQL connection.
+        deleted_hashes (set): Key fingerprints of the orders to mark removed.
+        removal_date (str, optional): Date to store. Defaults to today.
+        batch_size (int): Fingerprints per UPDATE statement.
+    Returns:
+        int: Number of rows marked removed.
+    Raises:
+        Exception: If any UPDATE fails; the whole transaction is rolled back first.
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    table_name = config['general']['table_name']
+
+    removal_date = removal_date or datetime.now().strftime('%Y-%m-%d')
+    deleted_hashes = sorted(deleted_hashes)
+
+    cursor = connection.cursor()
+    marked = 0
+    try:
+        for start in range(0, len(deleted_hashes), batch_size):
+            batch = deleted_hashes[start:start + batch_size]
+            placeholders = ", ".join(["%s"] * len(batch))
+            cursor.execute(
+                f"UPDATE {table_name} SET removal_date = %s "
+                f"WHERE removal_date IS NULL AND key_hash IN ({placeholders})",
+                (removal_date, *batch),
+            )
+            marked += cursor.rowcount
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return marked
+
+
+def revive_orders(connection, revived_hashes, batch_size=1000):
+
+    """
+    Clears `removal_date` on orders marked removed that are listed on the website
+    again, in batched UPDATEs inside one transaction.
+    Args:
+        connection: An open MySQL connection.
+        revived_hashes (set): Key fingerprints of the orders to revive.
+        batch_size (int): Fingerprints per UPDATE statement.
+    Returns:
+        int: Number of rows revived.
+    Raises:
+        Exception: If any UPDATE fails; the whole transaction is rolled back first.
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    table_name = config['general']['table_name']
+
+    revived_hashes = sorted(revived_hashes)
+
+    cursor = connection.cursor()
+    revived = 0
+    try:
+        for start in range(0, len(revived_hashes), batch_size):
+            batch = revived_hashes[start:start + batch_size]
+            placeholders = ", ".join(["%s"] * len(batch))
+            cursor.execute(
+                f"UPDATE {table_name} SET removal_date = NULL "
+                f"WHERE removal_date IS NOT NULL AND key_hash IN ({placeholders})",
+                tuple(batch),
+            )
+            revived += cursor.rowcount
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return revived
+
+
+def detect_deleted_orders(connection, scraped_hashes):
+
+    """
+    Finds orders that are no longer listed on the website and marks them removed.
+    Orders marked removed in an earlier run that are listed again are revived
+    first (see `revive_orders`) and counted in `log_details.updated_count`;
+    the diff treats them as known orders, so they are not inserted again.
+    The resulting count is stored in `log_details.deleted_source_count` (and the
+    source in `log_details.deleted_source`) for `log.insert_log_into_table`.
+    Nothing is changed when `[deletions] enabled` is off or when
+    `check_deletion_is_safe` refuses.
+    Args:
+        connection: An open MySQL connection.
+        scraped_hashes (set): Key fingerprints scraped in this run.
+    Returns:
+        int: Number of orders marked removed.
+    """
+
+    print("detect_deleted_orders function is called")
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    if not config.getboolean('deletions', 'enabled', fallback=True):
+        return 0
+
+    batch_size = config.getint('deletions', 'batch_size', fallback=1000)
+    order_keys.ensure_column(connection, "removal_date", "DATE NULL")
+
+    removed_hashes = order_keys.fetch_key_hashes(connection, where="removal_date IS NOT NULL")
+    revived_hashes = removed_hashes & scraped_hashes
+    if revived_hashes:
+        revived = revive_orders(connection, revived_hashes, batch_size=batch_size)
+        print(f"{revived} removed orders are listed on the website again and were revived")
+        log_details.updated_count += revived
+
+    active_hashes = order_keys.fetch_key_hashes(connection, where="removal_date IS NULL")
+    deleted_hashes = find_deleted_hashes(scraped_hashes, active_hashes)
+    print(f"Rows in database but not on the website (Deleted Data): {len(deleted_hashes)}")
+
+    refusal = check_deletion_is_safe(len(scraped_hashes), len(active_hashes), len(deleted_hashes))
+    if refusal:
+        print(f"Not marking deleted orders: {refusal}")
+        return 0
+    if not deleted_hashes:
+        return 0
+
+    marked = mark_orders_removed(connection, deleted_hashes, batch_size=batch_size)
+    print(f"{marked} orders marked as removed")
+
+    log_details.deleted_source = log_details.source_name
+    log_details.deleted_source_count = marked
+    return marked
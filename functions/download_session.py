@@ -0,0 +1,184 @@
+import random
+import threading
+import configparser
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import log_details
+
+
+# Responses worth another try: rate limiting and server-side errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Errors worth another try: resets, dropped connections, stalled reads and
+# transfers that passed `[downloads] file_timeout`
+RETRY_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.Timeout,
+    TimeoutError,
+)
+
+
+class RetryPolicy:
+
+    """
+    Decides when a failed attempt is retried and counts what happened during the run.
+    Delays grow exponentially from `backoff_base` up to `backoff_max`, with full
+    jitter so concurrent workers do not retry in lockstep. A `Retry-After` header
+    (seconds or an HTTP date) is honoured instead, up to `retry_after_max`.
+    Args:
+        max_retries (int): Retries after the first attempt.
+        backoff_base (float): Seconds before the first retry (before jitter).
+        backoff_max (float): Largest backoff in seconds.
+        retry_after_max (float): Largest Retry-After honoured, in seconds.
+    """
+
+    def __init__(self, max_retries=4, backoff_base=1.0, backoff_max=30.0, retry_after_max=120.0):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.retry_reasons = {}
+
+    def retry_after(self, response):
+
+        """Returns the delay a 429/503 response asks for in seconds, or None."""
+
+        value = response.headers.get("Retry-After") if response is not None else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+            return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    def retry_delay(self, attempt, response=None, error=None):
+
+        """
+        Returns how long to wait before retrying, or None when the attempt should not be retried.
+        Args:
+            attempt (int): 0 for the first attempt.
+            response (requests.Response, optional): The response received.
+            error (Exception, optional): The error raised instead of a response.
+        """
+
+        if error is not None:
+            if not isinstance(error, RETRY_ERRORS):
+                return None
+            reason = type(error).__name__
+        elif response is not None and response.status_code in RETRY_STATUSES:
+            reason = str(response.status_code)
+        else:
+            return None
+        if attempt >= self.max_retries:
+            return None
+
+        delay = self.retry_after(response)
+        if delay is not None:
+            delay = min(delay, self.retry_after_max)
+        else:
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+        with self.lock:
+            self.retries += 1
+            self.retry_reasons[reason] = self.retry_reasons.get(reason, 0) + 1
+        return delay
+
+    def record_request(self):
+        with self.lock:
+            self.requests += 1
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+
+    def summary(self):
+
+        """Returns a one-line summary of the run's requests, retries and failures."""
+
+        reasons = ", ".join(f"{reason}: {count}" for reason, count in sorted(self.retry_reasons.items()))
+        return (f"{self.requests} attachment requests, {self.retries} retries"
+                f"{f' ({reasons})' if reasons else ''}, {self.failures} failed downloads")
+
+
+def create_download_session(pool_size=4):
+
+    """
+    Creates the keep-alive session shared by the download workers.
+    The connection pool holds `pool_size` connections per host, matching the
+    number of downloads in flight, so every worker reuses its TCP+TLS connection.
+    Retries are handled by `RetryPolicy`, not by urllib3.
+    Args:
+        pool_size (int): Connections kept per host.
+    Returns:
+        requests.Session: The pooled session.
+    """
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                      "(KHTML, like Gecko) Chrome/122.0 Safari/537.36",
+    })
+    return session
+
+
+_session = None
+_policy = None
+
+
+def get_session():
+
+    """Returns the run's shared download session, creating it on first use."""
+
+    global _session
+    if _session is None:
+        config = configparser.ConfigParser()
+        config.read('config.ini')
+        _session = create_download_session(config.getint('downloads', 'max_in_flight', fallback=4))
+    return _session
+
+
+def get_retry_policy():
+
+    """Returns the run's shared `RetryPolicy`, configured from `[downloads]`."""
+
+    global _policy
+    if _policy is None:
+        config = configparser.ConfigParser()
+        config.read('config.ini')
+        _policy = RetryPolicy(
+            max_retries=config.getint('downloads', 'max_retries', fallback=4),
+            backoff_base=config.getfloat('downloads', 'backoff_base', fallback=1.0),
+            backoff_max=config.getfloat('downloads', 'backoff_max', fallback=30.0),
+            retry_after_max=config.getfloat('downloads', 'retry_after_max', fallback=120.0),
+        )
+    return _policy
+
+
+def record_download_summary():
+
+    """
+    Prints the run's retry summary and stores it in `log_details`
+    (`pdf_download_retries`, `pdf_download_failures`) for the log table.
+    """
+
+    policy = get_retry_policy()
+    print(f"Download summary: {policy.summary()}")
+    log_details.pdf_download_retries = policy.retries
+    log_details.pdf_download_failures = policy.failures
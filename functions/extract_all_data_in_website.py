@@ -1,67 +1,161 @@
-import time
+import json
 import traceback
-import pandas as pd
 import os
-from selenium import webdriver
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
-from bs4 import BeautifulSoup
 from datetime import datetime
-from selenium.webdriver.common.keys import Keys
-from functions import check_increment_data, log, send_mail
+from functions import log, send_mail, row_sink, wait_engine, browser, browser_pool, crawl_checkpoint, watermark, snapshot, memory_budget, order_schema
 import sys
-from selenium.common.exceptions import TimeoutException, WebDriverException, NoSuchElementException
 import configparser
 import log_details
 config = configparser.ConfigParser()
 config.read('config.ini')
 
 
-try: 
-    # Open the URL and maximize the browser window
-    # driver = webdriver.Chrome()
+# The browser is no longer opened at import time: `browser.get_driver()` starts
+# it the first time a scrape stage needs it.
 
-    chrome_options = webdriver.ChromeOptions()
 
-    # Enable headless mode
-    chrome_options.add_argument("--headless=new")  # Use new headless mode for better compatibility
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--window-size=1920,1080")  # Set window size to avoid hidden elements
+def handle_security_warning(page):
+    """Check for security warning and handle it."""
+    browser.handle_security_warning(browser.get_driver(), page)
     
-    # service = Service(chrome_driver_path)
-    driver = webdriver.Chrome(options=chrome_options)
-           
-    driver.get(config['url']['dgft_url'])
-    driver.maximize_window()
-    time.sleep(20)
 
-except(TimeoutException, WebDriverException, NoSuchElementException) as e:
-    raise Exception("Website not opened correctly") from e
 
+# JavaScript run inside the page to read rows straight out of the DataTables
+# instance. Rows are returned in the table's current order, `length` rows at a
+# time starting from `start`, so large listings can be pulled in a few calls.
+# It fails when the browser does not hold every row (serverSide processing, or
+# fewer rows than `page.info().recordsDisplay`), so the caller paginates instead.
+DATATABLES_DUMP_JS = """
+    var start = arguments[0];
+    var length = arguments[1];
+    var table = $('#metaTable').DataTable();
+    var headers = $('#metaTable thead tr:first th').map(function () {
+        return $(this).text().trim();
+    }).get();
+    if (table.settings()[0].oFeatures.bServerSide) {
+        // serverSide tables only hold the page being shown
+        return JSON.stringify({error: 'serverSide table, rows are not all in the browser'});
+    }
+    var nodes = table.rows({order: 'current', search: 'applied'}).nodes().toArray();
+    var total = nodes.length;
+    var expected = table.page.info().recordsDisplay;
+    if (total !== expected) {
+        return JSON.stringify({error: 'browser holds ' + total + ' of ' + expected + ' rows'});
+    }
+    var rows = [];
+    for (var i = start; i < Math.min(start + length, total); i++) {
+        var tr = nodes[i];
+        if (!tr) {
+            // deferRender leaves undrawn rows without a DOM node
+            return JSON.stringify({error: 'row node ' + i + ' not rendered'});
+        }
+        var tds = $(tr).children('td');
+        var row = tds.slice(0, -1).map(function () {
+            return $(this).text().trim();
+        }).get();
+        var link = tds.last().find('a');
+        row.push(link.length ? link.attr('href') : 'No Link');
+        rows.push(row);
+    }
+    return JSON.stringify({headers: headers, total: total, rows: rows});
+"""
+
+
+def extract_rows_via_datatables_api(sink, batch_size=5000, watermark_tracker=None):
 
-def handle_security_warning(page):
-    """Check for security warning and handle it."""
-    try:
-    
-        if "j_spring_security_logout" in driver.current_url:
-            print("Security warning detected! Refreshing page...")
-            # driver.refresh()
-            driver.delete_all_cookies()
-            driver.get(config['url']['dgft_url'])
-            # driver.execute_script("location.reload();")
-            zero_indexed_page = page - 1 
-            js_code = f"""
-                $('#metaTable').DataTable().page({zero_indexed_page}).draw(false);
-            """
-            driver.execute_script(js_code)
-            time.sleep(25)  # Wait for refresh
-    except Exception as e:
-        print(f"Error handling security warning: {e}")
-        raise e
-    
+    """
+    Reads every row of the metaTable directly from the DataTables API.
+    Instead of drawing each page and re-parsing the whole page source, the rows
+    already held by the DataTables instance in the browser are serialised to JSON
+    with `execute_script`, `batch_size` rows per call, and each batch is appended
+    to `sink`. Each row has the same shape as the paginated scraper produces: the
+    cell text of every column except the last, followed by the attachment href
+    (or "No Link").
+    Args:
+        sink (RowSink): Spool the fetched rows are appended to.
+        batch_size (int): Number of rows returned by one `execute_script` call.
+        watermark_tracker (KnownRowWatermark, optional): Stops fetching once enough
+            consecutive known rows have been seen (incremental crawl).
+    Raises:
+        Exception: If the DataTables instance cannot be read, does not hold every
+                   row or a row has not been rendered, so the caller can fall back
+                   to the paginated scrape.
+    """
+
+    print("extract_rows_via_datatables_api function is called")
+
+    driver = browser.get_driver()
+    start = 0
+    while True:
+        result = json.loads(driver.execute_script(DATATABLES_DUMP_JS, start, batch_size))
+        if "error" in result:
+            raise Exception(f"DataTables dump failed: {result['error']}")
+        if not result["headers"] or not result["rows"]:
+            raise Exception("DataTables dump returned no rows")
+
+        sink.write_page(start // batch_size + 1, result["headers"], result["rows"])
+        print(f"Fetched {sink.rows_written} of {result['total']} rows from DataTables API")
+
+        if watermark_tracker and watermark_tracker.observe(result["headers"], result["rows"]):
+            print(f"Reached {watermark_tracker.stop_after} consecutive known rows, stopping early")
+            break
+
+        start += batch_size
+        if start >= result["total"]:
+            break
+
+
+def extract_rows_via_pagination(sink, spool_name, checkpoint=None, watermark_tracker=None):
+
+    """
+    Reads every row of the metaTable by drawing each DataTables page in turn and
+    parsing just the table's outerHTML (lxml by default, see `table_parser`).
+    This is the original scrape path and is kept as the fallback for when the
+    DataTables API dump is unavailable. The page length is raised first (see
+    `browser.set_page_length`) so fewer pages are drawn. With
+    `[browser_pool] workers` above 1 the pages are sharded across a pool of
+    browsers instead. Each page's rows are appended to `sink` once, rather than
+    rewriting the whole Excel sheet after every page.
+    A crawl checkpoint is saved after every page, so an interrupted crawl
+    continues from the last completed page when the listing keeps its shape.
+    Args:
+        sink (RowSink): Spool the scraped rows are appended to.
+        spool_name (str): Name of the spool, recorded in the checkpoint.
+        checkpoint (dict, optional): Checkpoint left by an interrupted run.
+        watermark_tracker (KnownRowWatermark, optional): Stops paging once enough
+            consecutive known rows have been seen (incremental crawl).
+    """
+
+    print("extract_rows_via_pagination function is called")
+
+    driver = browser.get_driver()
+
+    html_parser = config.get('scraper', 'html_parser', fallback='lxml')
+    record_pages_path = config.get('scraper', 'record_pages_path', fallback='').strip()
+    if record_pages_path:
+        os.makedirs(record_pages_path, exist_ok=True)
+
+    browser.set_page_length(driver, config.get('scraper', 'page_length', fallback='max'))
+    total_page = browser.get_total_pages(driver)
+    listing_shape = browser.get_listing_shape(driver)
+
+    print('total_page',total_page)
+
+    start_page = crawl_checkpoint.get_resume_page(checkpoint, listing_shape, sink)
+
+    # The pool's browsers are not sorted newest first, so incremental crawls stay sequential
+    if config.getint('browser_pool', 'workers', fallback=1) > 1 and watermark_tracker is None:
+        browser_pool.scrape_pages_in_parallel(total_page, sink, start_page, spool_name, listing_shape)
+        return
+
+    for page in range(start_page, (int(total_page)+1)):  # Resume from last extracted page
+        headers, table_data = browser.scrape_page(driver, page, html_parser, record_pages_path)
+        sink.write_page(page, headers, table_data)
+        crawl_checkpoint.save_checkpoint(spool_name, sink, page, total_page, listing_shape)
+
+        if watermark_tracker and watermark_tracker.observe(headers, table_data):
+            print(f"Reached {watermark_tracker.stop_after} consecutive known rows on page {page}, stopping early")
+            break
 
 
 def extract_all_data_in_website():
@@ -77,11 +171,15 @@ def extract_all_data_in_website():
     Raises:
         Exception: If the website cannot be opened or if an error occurs during data extraction.
     Workflow:
-        1. Initializes a headless Chrome WebDriver.
-        2. Opens the target URL and maximizes the browser window.
-        3. Scrapes table data from the webpage, including headers and rows.
-        4. Handles pagination by clicking the "next page" button until no more pages are available.
-        5. Saves the extracted data to an Excel file with a timestamp.
+        1. Starts the shared headless Chrome WebDriver on first use (`browser.get_driver()`).
+        2. Opens the target URL and waits for the metaTable to be ready.
+        3. Reads all rows from the DataTables API in a few `execute_script` calls
+           (`[scraper] scrape_mode = datatables_api`).
+        4. Falls back to drawing each page and parsing it when the API dump fails
+           or `scrape_mode = paginated`.
+        5. Appends each page's rows to a chunked spool (`[spool]` in config.ini), reads it
+           back once at the end and hands the DataFrame to `check_increment_data`.
+           A dated snapshot is written on the side (`[snapshots]` in config.ini).
         6. Logs errors and sends email notifications in case of failures.
     Notes:
         - The function uses configuration values from `log_details` for table tags and URL.
@@ -107,85 +205,62 @@ def extract_all_data_in_website():
         config = configparser.ConfigParser()
         config.read('config.ini')       
         
-        table_data = []  # Store extracted data
-        headers = []  # Initialize headers list
-        
-        time.sleep(20)
-        page_count = driver.find_element(By.XPATH,config['xpaths']['page_count'])
-        total_page = page_count.text
-
-        print('total_page',total_page)
-        
-        for page in range(1, (int(total_page)+1)):  # Resume from last extracted page
-     
-            zero_indexed_page = page - 1  # Convert to DataTables page index (0-based)
-
-            
-            max_retries = 3  # Maximum number of retries for JavaScript execution
-            for attempt in range(max_retries):
-                try:
-                    # JavaScript to navigate to the desired page
-                    js_code = f"""
-                        $('#metaTable').DataTable().page({zero_indexed_page}).draw(false);
-                    """
-
-                    driver.execute_script(js_code)
-                    # print(f"JavaScript executed successfully on attempt {attempt + 1}")
-                    break  # Success
-                except Exception as e:
-                    print(f"Attempt {attempt + 1} failed: {e}")
-                    time.sleep(3)
-
-            time.sleep(3)  # Wait for table to update
-
-            print(f"Successfully jumped to page {page} using JavaScript")
-            handle_security_warning(page)  # Check for security warning
-
-            # Wait until table is updated
-            # WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "metaTable")))
-            page_source = driver.page_source
-
-            # Parse the page content using BeautifulSoup to extract table data
-            soup = BeautifulSoup(page_source, 'html.parser')
-        
-            # Extract the table from the webpage
-            table = soup.find(config['table_tags']['table_tag'])
-            headers = []  # List to store the table headers
-            rows = table.find_all(config['table_tags']['tr_tag'])  # Find all rows in the table
-
-            # Extract table headers (first row)
-            header_row = rows[0]
-            header_columns = header_row.find_all(config['table_tags']['th_tag'])
-            for col in header_columns:
-                headers.append(col.text.strip())  # Append cleaned header names
-            
-        
-            for row in rows[1:]:  # Skip the header row
-                columns = row.find_all(config['table_tags']['td_tag'])
-                
-                # Extract text from all columns except the last one
-                row_data = [col.text.strip() for col in columns[:-1]]
-                
-                # Extract href from the last column
-                href = columns[-1].find("a")["href"] if columns[-1].find("a") else "No Link"
-                
-                row_data.append(href)  # Append extracted href
-                table_data.append(row_data)   
-
-            # Save the extracted data to an Excel file
-            df = pd.DataFrame(table_data, columns=headers)
-
-            current_date = datetime.now().strftime("%Y-%m-%d")
-
-            first_excel_sheet_name = f"first_excel_sheet_{current_date}.xlsx"
-            
-            # Build full path using os.path.join
-            first_exceL_sheet_path = os.path.join(config['file_paths']['first_excel_sheet_path'], first_excel_sheet_name)
-                
-            df.to_excel(first_exceL_sheet_path, index=False)
-
-        print(f"Data saved to {first_exceL_sheet_path}.")
-        check_increment_data.check_increment_data(first_exceL_sheet_path)
+        # Starts Chrome and opens the listing on first use
+        driver = browser.get_driver()
+        wait_engine.wait_for_table_ready(driver)
+
+        current_date = datetime.now().strftime("%Y-%m-%d")
+
+        checkpoint = crawl_checkpoint.load_checkpoint()
+
+        # Incremental runs sort newest first and stop at the watermark; None means full crawl
+        watermark_tracker = watermark.start_incremental_crawl(driver)
+        log_details.full_crawl = watermark_tracker is None
+
+        scrape_mode = config.get('scraper', 'scrape_mode', fallback='datatables_api')
+        scraped = False
+        if scrape_mode == "datatables_api":
+            # The API dump gets a spool of its own so it never clobbers a checkpointed crawl
+            sink = row_sink.create_row_sink(f"first_excel_sheet_{current_date}_api")
+            try:
+                batch_size = config.getint('scraper', 'api_batch_size', fallback=5000)
+                extract_rows_via_datatables_api(sink, batch_size, watermark_tracker)
+                scraped = True
+            except Exception as e:
+                print(f"DataTables API dump failed, falling back to paginated scrape: {e}")
+                sink.reset()  # Drop partial rows
+
+        if not scraped:
+            if checkpoint:
+                spool_name = checkpoint["spool_name"]
+                sink = row_sink.create_row_sink(spool_name, resume=True)
+            else:
+                spool_name = f"first_excel_sheet_{current_date}"
+                sink = row_sink.create_row_sink(spool_name)
+            extract_rows_via_pagination(sink, spool_name, checkpoint, watermark_tracker)
+
+        # Read the spooled rows back once; the snapshot on disk is optional
+        chunk_rows = memory_budget.get_chunk_rows()
+        if chunk_rows:
+            # Chunked mode: batches are read from the spool as the next stage consumes them
+            chunks = (order_schema.apply_schema(chunk) for chunk in sink.iter_chunks(chunk_rows))
+            df = snapshot.tee_snapshot(chunks, 'first_excel_sheet_path', 'first_excel_sheet')
+        else:
+            df = order_schema.apply_schema(sink.finish())
+            snapshot.write_snapshot(df, 'first_excel_sheet_path', 'first_excel_sheet')
+        if checkpoint and scraped:
+            # The crawl the checkpoint belonged to is no longer needed
+            row_sink.create_row_sink(checkpoint["spool_name"], resume=True).reset()
+        crawl_checkpoint.clear_checkpoint()
+        if log_details.full_crawl:
+            watermark.record_full_crawl()
+        wait_engine.print_wait_summary()
+        memory_budget.record_stage("scrape")
+
+        browser.quit_driver()  # The remaining stages do not need the browser
+
+        from functions import check_increment_data
+        check_increment_data.check_increment_data(df)
 
     except AttributeError as e:  # If table is None
         handle_security_warning()   
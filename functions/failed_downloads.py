@@ -0,0 +1,148 @@
+import os
+import json
+import configparser
+from datetime import datetime
+
+from functions import order_keys
+
+
+# Spooled attachment downloads that still failed after every retry
+FAILED_DOWNLOADS_NAME = "failed_downloads.jsonl"
+
+
+def get_spool_path():
+
+    """Returns the failed-downloads spool file under `[spool] spool_path`."""
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    spool_dir = config.get('spool', 'spool_path', fallback=os.path.join('data', 'spool'))
+    return os.path.join(spool_dir, FAILED_DOWNLOADS_NAME)
+
+
+def load_failed_downloads():
+
+    """
+    Reads the spooled failed downloads.
+    Returns:
+        list: One dict per order (key_hash, pdf_url, pdf_name, local_path, pdf_path,
+              failed_at); the latest entry wins when an order was spooled twice.
+    """
+
+    spool_path = get_spool_path()
+    if not os.path.exists(spool_path):
+        return []
+    entries = {}
+    with open(spool_path, encoding="utf-8") as spool_file:
+        for line in spool_file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A line cut short by a crash
+                continue
+            entries[entry["key_hash"]] = entry
+    return list(entries.values())
+
+
+def save_failed_downloads(entries):
+
+    """Rewrites the spool atomically with `entries` (removing it when empty)."""
+
+    spool_path = get_spool_path()
+    if not entries:
+        if os.path.exists(spool_path):
+            os.remove(spool_path)
+        return
+    os.makedirs(os.path.dirname(spool_path) or ".", exist_ok=True)
+    with open(spool_path + ".tmp", "w", encoding="utf-8") as spool_file:
+        for entry in entries:
+            spool_file.write(json.dumps(entry) + "\n")
+    os.replace(spool_path + ".tmp", spool_path)
+
+
+def record_failed_downloads(df, plan, results):
+
+    """
+    Spools the rows of a chunk whose attachment could not be downloaded, so a later
+    run retries them (see `retry_failed_downloads`). Rows skipped on purpose
+    (no or malformed URL) are not spooled.
+    Args:
+        df (pd.DataFrame): The chunk, with database column names.
+        plan (pd.DataFrame): Its plan from `download_pdf.plan_pdf_paths`.
+        results (dict): index -> (pdf_name, pdf_path) from `pdf_downloader.download_planned`.
+    Returns:
+        int: Number of rows spooled.
+    """
+
+    failed = plan[(plan["skip"] == "") & ~plan.index.isin(list(results))]
+    if failed.empty:
+        return 0
+
+    key_hashes = df['key_hash'] if 'key_hash' in df.columns else order_keys.key_fingerprint(df)
+    failed_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    entries = [
+        {
+            "key_hash": key_hashes[index],
+            "pdf_url": row["pdf_url"],
+            "pdf_name": row["pdf_name"],
+            "local_path": row["local_path"],
+            "pdf_path": row["pdf_path"],
+            "failed_at": failed_at,
+        }
+        for index, row in failed.iterrows()
+    ]
+
+    spool_path = get_spool_path()
+    os.makedirs(os.path.dirname(spool_path) or ".", exist_ok=True)
+    with open(spool_path, "a", encoding="utf-8") as spool_file:
+        for entry in entries:
+            spool_file.write(json.dumps(entry) + "\n")
+    print(f"Spooled {len(entries)} failed downloads to {spool_path}")
+    return len(entries)
+
+
+def retry_failed_downloads(store=None):
+
+    """
+    Retries the downloads spooled by earlier runs and fills in the pdf_name and
+    pdf_path of their orders, which were inserted without them. Entries that
+    fail again stay in the spool for the next run.
+    Args:
+        store (pdf_store.PdfStore, optional): Content-addressed store (see `pdf_store.get_store`).
+    Returns:
+        int: Number of orders whose PDF is now downloaded.
+    """
+
+    entries = load_failed_downloads()
+    if not entries:
+        return 0
+
+    import pandas as pd
+    from functions import db_connection, pdf_downloader
+
+    print(f"Retrying {len(entries)} downloads that failed in earlier runs")
+    plan = pd.DataFrame(entries).assign(skip="")
+    for folder in plan["local_path"].map(os.path.dirname).unique():
+        os.makedirs(folder, exist_ok=True)
+    results = pdf_downloader.download_planned(plan, store=store)
+    if not results:
+        return 0
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    connection = db_connection.db_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.executemany(
+            f"UPDATE {config['general']['table_name']} SET pdf_name = %s, pdf_path = %s WHERE key_hash = %s",
+            [(*results[index], plan.at[index, "key_hash"]) for index in sorted(results)],
+        )
+        connection.commit()
+    finally:
+        cursor.close()
+        connection.close()
+
+    save_failed_downloads([entry for index, entry in enumerate(entries) if index not in results])
+    print(f"Recovered {len(results)} of {len(entries)} earlier failed downloads")
+    return len(results)
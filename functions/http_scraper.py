@@ -0,0 +1,304 @@
+import sys
+import json
+import traceback
+import configparser
+
+import requests
+import pandas as pd
+from bs4 import BeautifulSoup
+from bs4.element import Tag
+from requests.adapters import HTTPAdapter
+
+from functions import check_increment_data, log, send_mail, snapshot, order_schema
+import log_details
+
+
+def create_http_session(pool_size=4):
+
+    """
+    Creates a pooled HTTP session for fetching the DGFT order listing.
+    Args:
+        pool_size (int): Number of keep-alive connections kept per host.
+    Returns:
+        requests.Session: A session with a connection pool mounted for http and https.
+    """
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                      "(KHTML, like Gecko) Chrome/122.0 Safari/537.36",
+    })
+    return session
+
+
+def parse_cells(cells):
+
+    """
+    Converts the cells of one table row into the scraper's row format.
+    Every cell but the last is reduced to its stripped text; the last cell
+    contributes the href of its link, or "No Link" when it has none. Cells may be
+    BeautifulSoup tags or values from a DataTables JSON payload; only JSON
+    strings containing markup or entities are run through the HTML parser.
+    Args:
+        cells (list): The cells of a single row.
+    Returns:
+        list: The row values, ending with the attachment href.
+    """
+
+    cells = [BeautifulSoup(cell, "html.parser") if isinstance(cell, str) and ("<" in cell or "&" in cell) else cell
+             for cell in cells]
+    row_data = [cell.get_text().strip() if isinstance(cell, Tag) else str(cell).strip()
+                for cell in cells[:-1]]
+    link = cells[-1].find("a") if cells and isinstance(cells[-1], Tag) else None
+    row_data.append(link["href"] if link and link.has_attr("href") else "No Link")
+    return row_data
+
+
+def parse_listing_html(html):
+
+    """
+    Extracts headers and rows from the `#metaTable` embedded in the listing page.
+    Args:
+        html (str): The HTML of the order listing page.
+    Returns:
+        tuple: (headers, table_data). table_data is empty when the table body is
+               populated client-side rather than embedded in the page.
+    Raises:
+        Exception: If the page does not contain a table.
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.find(config['table_tags']['table_tag'], id="metaTable") or soup.find(config['table_tags']['table_tag'])
+    if table is None:
+        raise Exception("metaTable not found in listing page")
+
+    rows = table.find_all(config['table_tags']['tr_tag'])
+    headers = [col.text.strip() for col in rows[0].find_all(config['table_tags']['th_tag'])] if rows else []
+
+    table_data = []
+    for row in rows[1:]:
+        columns = row.find_all(config['table_tags']['td_tag'])
+        if len(columns) < 2:  # DataTables "No data available" placeholder row
+            continue
+        table_data.append(parse_cells(columns))
+
+    return headers, table_data
+
+
+def field_name(name):
+
+    """Reduces a header or JSON field name to lower-case letters and digits, e.g. "RA File No." -> "rafileno"."""
+
+    return "".join(char for char in str(name).lower() if char.isalnum())
+
+
+def row_cells(row, headers):
+
+    """
+    Returns the cells of one JSON row in header order.
+    List rows are taken as they are. Object rows are mapped field by field: a
+    field matches a header when their `field_name`s are equal, or when it is
+    named after the column's position (DataTables "0", "1", ...). Headers with
+    no matching field are left empty.
+    Args:
+        row (list | dict): One row of the payload.
+        headers (list): The table headers.
+    Raises:
+        Exception: If an object row matches none of the headers.
+    """
+
+    if not isinstance(row, dict):
+        return list(row)
+    if not headers:
+        raise Exception("Cannot map JSON object rows without the table headers")
+
+    fields = {field_name(key): value for key, value in row.items()}
+    cells = []
+    matched = 0
+    for position, header in enumerate(headers):
+        for key in (field_name(header), str(position)):
+            if key in fields:
+                cells.append(fields[key])
+                matched += 1
+                break
+        else:
+            cells.append("")
+    if not matched:
+        raise Exception(f"JSON row fields {sorted(row)} match none of the headers {headers}")
+    return cells
+
+
+def parse_listing_json(payload, headers=None):
+
+    """
+    Extracts rows from a DataTables style JSON payload.
+    Accepts either a bare list of rows or an object holding the rows under
+    "data" or "aaData". Rows may be lists of cells in column order, or objects
+    whose fields are mapped to `headers` by name (see `row_cells`).
+    Args:
+        payload (dict | list): The decoded JSON response.
+        headers (list, optional): The table headers; required for object rows.
+    Returns:
+        list: The rows in the scraper's row format.
+    """
+
+    if isinstance(payload, dict):
+        payload = payload.get("data", payload.get("aaData", []))
+
+    table_data = []
+    for row in payload:
+        cells = row_cells(row, headers)
+        table_data.append(parse_cells(["" if cell is None else cell for cell in cells]))
+    return table_data
+
+
+def records_filtered(payload):
+
+    """Returns the row count a DataTables server-side payload reports, or None for a complete payload."""
+
+    if not isinstance(payload, dict):
+        return None
+    for key in ("recordsFiltered", "iTotalDisplayRecords", "recordsTotal", "iTotalRecords"):
+        if payload.get(key) is not None:
+            return int(payload[key])
+    return None
+
+
+def fetch_endpoint_rows(session, data_endpoint, headers, listing_url, page_size=500, timeout=60):
+
+    """
+    Reads every row from the JSON endpoint feeding `#metaTable`.
+    The endpoint is called like DataTables' server-side processing does, with
+    `draw`, `start` and `length` parameters, in `page_size` requests until
+    `recordsFiltered` rows have been read. An endpoint that ignores the
+    parameters and reports no count returns all its rows at once.
+    Args:
+        session (requests.Session): Session to use.
+        data_endpoint (str): The JSON endpoint.
+        headers (list): The table headers, used to map object rows.
+        listing_url (str): Sent as the Referer.
+        page_size (int): Rows per request.
+        timeout (int): Per-request timeout in seconds.
+    Returns:
+        list: The rows in the scraper's row format.
+    Raises:
+        Exception: If the endpoint stops returning rows before `recordsFiltered` is reached.
+    """
+
+    table_data = []
+    draw = 0
+    while True:
+        draw += 1
+        response = session.get(
+            data_endpoint,
+            params={"draw": draw, "start": len(table_data), "length": page_size},
+            timeout=timeout,
+            headers={"Referer": listing_url},
+        )
+        response.raise_for_status()
+        payload = json.loads(response.text)
+        page = parse_listing_json(payload, headers)
+        table_data.extend(page)
+
+        total = records_filtered(payload)
+        if total is None or len(table_data) >= total:
+            break
+        if not page:
+            raise Exception(f"{data_endpoint} returned no rows at offset {len(table_data)} of {total}")
+        print(f"Fetched {len(table_data)} of {total} rows from {data_endpoint}")
+    return table_data
+
+
+def fetch_rows(session=None, listing_url=None, data_endpoint=None, timeout=60, page_size=None):
+
+    """
+    Fetches the RAS/SEZ order listing over plain HTTP, without a browser.
+    The listing page is downloaded and `#metaTable` is parsed from it. When the
+    table body is filled client-side, the rows are taken from `data_endpoint`
+    instead (see `fetch_endpoint_rows`), paging through it `page_size` rows at
+    a time; the headers are still read from
+    the listing page.
+    Args:
+        session (requests.Session, optional): Session to use; a pooled one is created if omitted.
+        listing_url (str, optional): Listing page URL. Defaults to `[url] dgft_url`.
+        data_endpoint (str, optional): JSON endpoint feeding the table. Defaults to `[http_scraper] data_endpoint`.
+        timeout (int): Per-request timeout in seconds.
+        page_size (int, optional): Rows per endpoint request. Defaults to `[http_scraper] page_size`.
+    Returns:
+        tuple: (headers, table_data) in the same shape as the Selenium scraper.
+    Raises:
+        Exception: If the listing cannot be fetched or yields no rows.
+    """
+
+    print("fetch_rows function is called")
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    listing_url = listing_url or config['url']['dgft_url']
+    if data_endpoint is None:
+        data_endpoint = config.get('http_scraper', 'data_endpoint', fallback='').strip()
+    session = session or create_http_session(config.getint('http_scraper', 'pool_size', fallback=4))
+
+    response = session.get(listing_url, timeout=timeout)
+    response.raise_for_status()
+    headers, table_data = parse_listing_html(response.text)
+
+    if not table_data and data_endpoint:
+        print(f"metaTable body is empty, fetching rows from {data_endpoint}")
+        page_size = page_size or config.getint('http_scraper', 'page_size', fallback=500)
+        table_data = fetch_endpoint_rows(session, data_endpoint, headers, listing_url, page_size, timeout)
+
+    if not table_data:
+        raise Exception("No rows found in the order listing")
+
+    print(f"Fetched {len(table_data)} rows over HTTP")
+    return headers, table_data
+
+
+def extract_all_data_in_website():
+
+    """
+    Scrapes the order listing with the HTTP backend and hands it to the incremental check.
+    This is the browserless counterpart of
+    `extract_all_data_in_website.extract_all_data_in_website()`, selected with
+    `[scraper] backend = http`. It writes the same first_excel_sheet snapshot and
+    hands the DataFrame to `check_increment_data`.
+    Raises:
+        SystemExit: If the listing cannot be fetched; the failure is logged and mailed first.
+    """
+
+    print("http extract_all_data_in_website function is called")
+
+    try:
+        config = configparser.ConfigParser()
+        config.read('config.ini')
+
+        headers, table_data = fetch_rows(timeout=config.getint('http_scraper', 'request_timeout', fallback=60))
+
+        df = order_schema.apply_schema(pd.DataFrame(table_data, columns=headers))
+
+        snapshot.write_snapshot(df, 'first_excel_sheet_path', 'first_excel_sheet')
+        check_increment_data.check_increment_data(df)
+
+    except Exception as e:
+        traceback.print_exc()
+        log_details.log_list[1] = "Failure"
+        log_details.log_list[3] = "Error in http table data extraction part"
+        log.insert_log_into_table(log_details.log_list)
+        print("error in data extraction part======", log_details.log_list)
+        log_details.log_list = [None] * 8
+
+        send_mail.send_email("ras sez extract data in website error", e)
+        exc_type, exc_obj, exc_tb = sys.exc_info()
+        print(f"Error occurred at line {exc_tb.tb_lineno}:")
+        print(f"Exception Type: {exc_type}")
+        print(f"Exception Object: {exc_obj}")
+        print(f"Traceback: {exc_tb}")
+        sys.exit("script error")
@@ -5,7 +5,7 @@ import mysql.connector
 import sys 
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from functions import log, send_mail, db_connection
+from functions import log, send_mail, db_connection, order_keys, snapshot, memory_budget, order_schema
 import traceback
 import os
 
@@ -15,19 +15,22 @@ import log_details
 
 
 
-def insert_final_data_to_mysql(final_excel_sheets_path):
+def insert_final_data_to_mysql(final_data):
 
     """
-    Inserts incremental data from an Excel file into a MySQL database table.
-    This function reads data from the specified Excel file, processes it, and inserts it into the 
+    Inserts incremental data into a MySQL database table.
+    This function takes the final records from `download_pdf`, processes them, and inserts them into the 
     `dgft_ras_sez` table in the MySQL database. It also handles logging, error reporting, and email 
     notifications in case of failures.
     Args:
-        final_excel_sheets_path (str): The file path of the Excel sheet containing the data to be inserted.
+        final_data (pd.DataFrame | str | iterable): The records to insert (a DataFrame or
+            DataFrame chunks), or the path of a final snapshot (.parquet or .xlsx) when an
+            insert is rerun by hand.
     Raises:
         Exception: If any error occurs during the process, it is logged, and an email notification is sent.
     Workflow:
-        1. Reads the Excel file into a pandas DataFrame.
+        1. Takes the DataFrame (reading the snapshot only when a path is given), or
+           its chunks one at a time in chunked mode.
         2. Cleans the column names and replaces NaN values with None.
         3. Establishes a connection to the MySQL database.
         4. Iterates through each row of the DataFrame and inserts the data into the database.
@@ -38,9 +41,10 @@ def insert_final_data_to_mysql(final_excel_sheets_path):
         - The function assumes the existence of a `log_details` module for database connection 
           and logging configurations.
         - The `log` and `send_mail` modules are used for logging and email notifications, respectively.
-        - The `dgft_ras_sez` table schema must match the columns in the Excel file.
+        - The `dgft_ras_sez` table schema must match the columns of the data.
     Example:
-        insert_final_data_to_mysql("path/to/excel_file.xlsx")
+        insert_final_data_to_mysql(df)
+        insert_final_data_to_mysql("path/to/final_excel_sheet.parquet")
     """
 
     print("insert_final_data_to_mysqll function is called")
@@ -51,76 +55,88 @@ def insert_final_data_to_mysql(final_excel_sheets_path):
         config = configparser.ConfigParser()
         config.read('config.ini')
 
-        # Read the Excel file into a DataFrame
-        df = pd.read_excel(final_excel_sheets_path)
-        # df = df.iloc[:]
-        df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_').str.replace('.', '')
-        print("df_ columns    ", df)
-        
-
-         # Replace NaN with None to store NULL in MySQL
-        df = df.where(pd.notna(df), None)
-        
-        
         # Establish database connection
         connection = db_connection.db_connection()
         if not connection.is_connected():
             raise Error("Failed to connect to database")
         cursor = connection.cursor()
+        # key_hash and content_hash are written below; a replayed insert may come first
+        order_keys.ensure_key_hash_column(connection)
        
 
         count = 0
-        for index, row in df.iterrows():
-            # Convert row to dictionary and ensure all NaN values are None
-            row_dict = row.to_dict()
-            for key in row_dict:
-                if pd.isna(row_dict[key]):
-                    row_dict[key] = None
+        # One chunk at a time in chunked mode (`[memory] chunked`); all rows commit together
+        for df in snapshot.iter_frames(final_data, memory_budget.get_chunk_rows()):
+            # df = df.iloc[:]
+            order_keys.normalise_columns(df)
+            order_schema.apply_schema(df)
+            df['key_hash'] = order_keys.key_fingerprint(df)
+            df['content_hash'] = order_keys.content_fingerprint(df)
+            print("df_ columns    ", df)
+        
+
+             # Replace NaN with None to store NULL in MySQL
+            df = df.where(pd.notna(df), None)
+        
+        
+            for index, row in df.iterrows():
+                # Convert row to dictionary and ensure all NaN values are None
+                row_dict = row.to_dict()
+                for key in row_dict:
+                    if pd.isna(row_dict[key]):
+                        row_dict[key] = None
             
-            insert_query = f"""
-                INSERT INTO {config['general']['table_name']}(source_name, office, order_type, order_no, order_date, name_of_party, ra_file_no, category, iec, 
-                  issued_by, text_of_order, attachment, 
-                pdf_name, pdf_path)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
+                insert_query = f"""
+                    INSERT INTO {config['general']['table_name']}(source_name, office, order_type, order_no, order_date, name_of_party, ra_file_no, category, iec, 
+                      issued_by, text_of_order, attachment, 
+                    pdf_name, pdf_path, key_hash, content_hash)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """
             
-            values = (
-                'dgft_ras_sez',
-                row_dict.get("office"),
-                row_dict.get("order_type"),
-                row_dict.get("order_no"),
-                row_dict.get("order_date"),
-                row_dict.get("name_of_party"),
-                row_dict.get("ra_file_no"),
-                row_dict.get("category"),
-                row_dict.get("iec"),
-                row_dict.get("issued_by"),
-                row_dict.get("text_of_order"),
-                row_dict.get("attachment"),
-                row_dict.get("pdf_name"),
-                row_dict.get("pdf_path")
+                values = (
+                    'dgft_ras_sez',
+                    row_dict.get("office"),
+                    row_dict.get("order_type"),
+                    row_dict.get("order_no"),
+                    row_dict.get("order_date"),
+                    row_dict.get("name_of_party"),
+                    row_dict.get("ra_file_no"),
+                    row_dict.get("category"),
+                    row_dict.get("iec"),
+                    row_dict.get("issued_by"),
+                    row_dict.get("text_of_order"),
+                    row_dict.get("attachment"),
+                    row_dict.get("pdf_name"),
+                    row_dict.get("pdf_path"),
+                    row_dict.get("key_hash"),
+                    row_dict.get("content_hash")
                
-                )
+                    )
             
-            # Check for any remaining NaN values
-            clean_values = []
-            for val in values:
-                if pd.isna(val):  # Catch any remaining NaN values
-                    clean_values.append(None)
-                else:
-                    clean_values.append(val)
+                # Check for any remaining NaN values
+                clean_values = []
+                for val in values:
+                    if pd.isna(val):  # Catch any remaining NaN values
+                        clean_values.append(None)
+                    else:
+                        clean_values.append(val)
             
-            # Execute the SQL with cleaned values
-            cursor.execute(insert_query, tuple(clean_values))
-            count += 1
-            print(f"Row {count} has been successfully inserted into the MySQL database.")
+                # Execute the SQL with cleaned values
+                cursor.execute(insert_query, tuple(clean_values))
+                count += 1
+                print(f"Row {count} has been successfully inserted into the MySQL database.")
         connection.commit()
+        memory_budget.record_stage("insert")
+        memory_budget.print_memory_summary()
 
 
         log_details.log_list[1] = "Success"
         log_details.no_data_scraped = count
         log_details.newly_added_count = count
         log_details.log_list[3] = f"{log_details.newly_added_count} new data"
+        if log_details.pdf_download_failures or log_details.pdf_download_retries:
+            log_details.log_list[3] += (f", {log_details.pdf_download_failures} pdf downloads failed"
+                                        f" after {log_details.pdf_download_retries} retries")
         
         print("log table in insert final data to mysql function====", log_details.log_list)
         log.insert_log_into_table(log_details.log_list)
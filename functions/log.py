@@ -1,6 +1,5 @@
 from functions import get_data_count_database, db_connection
 import sys
-import json
 from datetime import datetime
 import log_details
 import configparser
@@ -41,8 +40,8 @@ def insert_log_into_table(log_list):
         cursor = connection.cursor()
 
         query = f"""
-            INSERT INTO {config['general']['log_table_name']} (source_name, script_status, data_available, data_scraped, total_record_count, failure_reason, comments, source_status, newly_added_count, deleted_source, deleted_source_count, removal_date)
-            VALUES (%(source_name)s, %(script_status)s, %(data_available)s, %(data_scraped)s, %(total_record_count)s, %(failure_reason)s, %(comments)s, %(source_status)s, %(newly_added_count)s, %(deleted_source)s, %(deleted_source_count)s, %(removal_date)s)
+            INSERT INTO {config['general']['log_table_name']} (source_name, script_status, data_available, data_scraped, total_record_count, failure_reason, comments, source_status, newly_added_count, updated_source_count, deleted_source, deleted_source_count, removal_date)
+            VALUES (%(source_name)s, %(script_status)s, %(data_available)s, %(data_scraped)s, %(total_record_count)s, %(failure_reason)s, %(comments)s, %(source_status)s, %(newly_added_count)s, %(updated_source_count)s, %(deleted_source)s, %(deleted_source_count)s, %(removal_date)s)
         """
         values = {
             'source_name': log_details.source_name if log_details.source_name else None,
@@ -54,7 +53,7 @@ def insert_log_into_table(log_list):
             'comments': log_list[3] if log_list[3] else None,
             'source_status': log_details.source_status,
             'newly_added_count': log_details.newly_added_count if log_details.newly_added_count else None,
-            # 'updated_source_count': log_details.updated_count if log_details.updated_count else None,
+            'updated_source_count': log_details.updated_count if log_details.updated_count else None,
             'deleted_source': log_details.deleted_source if log_details.deleted_source else None,
             'deleted_source_count': log_details.deleted_source_count if log_details.deleted_source_count else None,
             'removal_date' : removal_date if log_details.deleted_source_count else None
@@ -0,0 +1,146 @@
+import sys
+import configparser
+
+
+# Memory seen at the end of every stage, as (stage, current RSS MB, peak RSS MB,
+# whether the peak is the stage's own or the whole run's so far)
+stage_memory = []
+
+# False once `reset_peak_rss` has failed: the platform (e.g. Windows) only knows the
+# peak since the process started, so later peaks are process-wide
+peak_is_per_stage = True
+
+# Rough in-memory size of one scraped order row (text_of_order dominates), and how
+# many chunks are alive at once when the stages are chained (diff, download,
+# insert and pandas temporaries)
+ROW_BYTES_ESTIMATE = 4096
+CHUNKS_IN_FLIGHT = 4
+
+
+def get_chunk_rows():
+
+    """
+    Returns the rows per batch for chunked execution.
+    With `[memory] chunked = true` every stage consumes and produces bounded
+    batches. `chunk_rows` sets the batch size directly; when it is 0 the size is
+    derived from `memory_budget_mb`.
+    Returns:
+        int: Rows per batch, or None when stages process whole frames.
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    if not config.getboolean('memory', 'chunked', fallback=False):
+        return None
+    chunk_rows = config.getint('memory', 'chunk_rows', fallback=0)
+    if chunk_rows > 0:
+        return chunk_rows
+    budget_bytes = config.getint('memory', 'memory_budget_mb', fallback=1024) * 1024 * 1024
+    return max(1000, budget_bytes // (ROW_BYTES_ESTIMATE * CHUNKS_IN_FLIGHT))
+
+
+def current_rss_mb():
+
+    """Returns the resident set size of this process in MB, or None if it cannot be read."""
+
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb():
+
+    """
+    Returns the peak resident set size in MB (since start, or since `reset_peak_rss`
+    where the platform supports it), or None if it cannot be read.
+    """
+
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+        memory_info = psutil.Process().memory_info()
+        if hasattr(memory_info, "peak_wset"):  # Windows
+            return memory_info.peak_wset / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        return None
+
+
+def reset_peak_rss():
+
+    """
+    Resets the peak RSS counter, so the next stage reports its own peak.
+    Only Linux (`/proc/self/clear_refs`) supports this.
+    Returns:
+        bool: True when the counter was reset.
+    """
+
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def record_stage(stage):
+
+    """
+    Records the memory used by a stage that has just finished and starts the next
+    stage's peak from here. Where the peak cannot be reset it is recorded as the
+    run's peak so far. A warning is printed when the peak exceeds
+    `[memory] memory_budget_mb`.
+    Args:
+        stage (str): Stage name, e.g. "diff".
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    global peak_is_per_stage
+
+    current, peak = current_rss_mb(), peak_rss_mb()
+    stage_memory.append((stage, current, peak, peak_is_per_stage))
+    per_stage = peak_is_per_stage
+    peak_is_per_stage = reset_peak_rss()
+
+    budget = config.getint('memory', 'memory_budget_mb', fallback=1024)
+    if peak is not None and peak > budget:
+        peaked = f"{stage} peaked" if per_stage else f"the run has peaked (by the end of {stage})"
+        print(f"Warning: {peaked} at {peak:.0f} MB RSS, over the {budget} MB memory budget")
+
+
+def print_memory_summary():
+
+    """
+    Prints the RSS at the end of every recorded stage and its peak. Peaks that
+    could not be reset between stages are labelled as the run's peak so far.
+    """
+
+    for stage, current, peak, per_stage in stage_memory:
+        current = f"{current:.0f} MB" if current is not None else "n/a"
+        peak = f"{peak:.0f} MB" if peak is not None else "n/a"
+        print(f"memory {stage:10s} rss {current:>8s}, {'peak' if per_stage else 'run peak'} {peak:>8s}")
+    print(f"memory chunk rows: {get_chunk_rows() or 'whole frames'}")
@@ -0,0 +1,305 @@
+import hashlib
+import configparser
+
+
+# Composite key identifying an order, as database column names
+KEY_COLUMNS = ['order_type', 'order_no', 'name_of_party', 'ra_file_no']
+
+# Order details DGFT may correct after publishing; hashed into content_hash
+CONTENT_COLUMNS = ['office', 'order_date', 'category', 'iec', 'issued_by', 'text_of_order', 'attachment']
+
+# Separator between key parts before hashing (cannot occur in scraped text)
+KEY_SEPARATOR = "\x1f"
+
+FETCH_BATCH_SIZE = 50000
+
+
+def normalise_columns(df):
+
+    """
+    Converts table headers to database column names, e.g. "RA File No" -> "ra_file_no".
+    This is the normalisation `check_increment_data` and `insert_final_data_to_mysql`
+    apply to every sheet they read.
+    Args:
+        df (pd.DataFrame): Frame whose columns are renamed in place.
+    Returns:
+        pd.DataFrame: The same frame.
+    """
+
+    df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_').str.replace('.', '')
+    return df
+
+
+def normalise_key_value(value):
+
+    """
+    Normalises one key part: missing values become "", whitespace runs are
+    collapsed to single spaces and case is folded.
+    """
+
+    if value is None or value != value:  # None or NaN
+        return ""
+    return " ".join(str(value).split()).casefold()
+
+
+def fingerprint_key(values):
+
+    """
+    Returns the SHA-1 fingerprint of one composite key.
+    Args:
+        values (iterable): The key parts in `KEY_COLUMNS` order.
+    Returns:
+        str: 40 character hex digest.
+    """
+
+    joined = KEY_SEPARATOR.join(normalise_key_value(value) for value in values)
+    return hashlib.sha1(joined.encode("utf-8")).hexdigest()
+
+
+def row_fingerprint(df, columns, casefold=True):
+
+    """
+    Hashes the given columns of every row of a frame, column-wise.
+    Values are normalised like `normalise_key_value` (case folding optional) and
+    joined with `KEY_SEPARATOR` before hashing. Missing columns hash as "".
+    Args:
+        df (pd.DataFrame): Frame with database column names.
+        columns (list): Columns to hash, in order.
+        casefold (bool): Fold case before hashing.
+    Returns:
+        pd.Series: Hex SHA-1 fingerprints aligned with `df.index`.
+    """
+
+    import pandas as pd
+
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=object)
+
+    parts = []
+    for column in columns:
+        if column not in df.columns:
+            parts.append(pd.Series("", index=df.index))
+            continue
+        part = df[column].astype(object).where(df[column].notna(), "").astype(str).str.split().str.join(" ")
+        parts.append(part.str.casefold() if casefold else part)
+    joined = parts[0]
+    for part in parts[1:]:
+        joined = joined + KEY_SEPARATOR + part
+    return pd.Series([hashlib.sha1(key.encode("utf-8")).hexdigest() for key in joined], index=df.index)
+
+
+def key_fingerprint(df):
+
+    """
+    Computes the composite key fingerprint of every row of a frame.
+    The result matches `fingerprint_key` row for row.
+    Args:
+        df (pd.DataFrame): Frame with the `KEY_COLUMNS` columns (database names).
+    Returns:
+        pd.Series: Hex fingerprints aligned with `df.index`.
+    """
+
+    return row_fingerprint(df, KEY_COLUMNS)
+
+
+def content_fingerprint(df):
+
+    """
+    Computes the fingerprint of the editable order details (`CONTENT_COLUMNS`) of
+    every row. Case is kept, so case-only corrections are detected too.
+    Args:
+        df (pd.DataFrame): Frame with database column names.
+    Returns:
+        pd.Series: Hex fingerprints aligned with `df.index`.
+    """
+
+    return row_fingerprint(df, CONTENT_COLUMNS, casefold=False)
+
+
+def table_columns(connection):
+
+    """
+    Returns the column names of the orders table, without changing it.
+    Args:
+        connection: An open MySQL connection.
+    Returns:
+        set: The column names.
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() AND table_name = %s",
+        (config['general']['table_name'],),
+    )
+    columns = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    return columns
+
+
+def ensure_column(connection, column_name, definition, index=False):
+
+    """
+    Adds a column to the orders table if it does not exist yet.
+    Args:
+        connection: An open MySQL connection.
+        column_name (str): Name of the column.
+        definition (str): SQL type and options, e.g. "CHAR(40) NULL".
+        index (bool): Also add an index named `idx_<column_name>`.
+    Returns:
+        bool: True if the column was added.
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    table_name = config['general']['table_name']
+
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s",
+        (table_name, column_name),
+    )
+    added = cursor.fetchone()[0] == 0
+    if added:
+        print(f"Adding {column_name} column to {table_name}")
+        alter = f"ALTER TABLE {table_name} ADD COLUMN {column_name} {definition}"
+        if index:
+            alter += f", ADD INDEX idx_{column_name} ({column_name})"
+        cursor.execute(alter)
+    cursor.close()
+    return added
+
+
+def ensure_index(connection, column_name):
+
+    """
+    Adds an index named `idx_<column_name>` to the orders table unless the column
+    already leads an index.
+    Args:
+        connection: An open MySQL connection.
+        column_name (str): Name of the column.
+    Returns:
+        bool: True if the index was added.
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    table_name = config['general']['table_name']
+
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s AND seq_in_index = 1",
+        (table_name, column_name),
+    )
+    added = cursor.fetchone()[0] == 0
+    if added:
+        print(f"Adding index on {column_name} to {table_name}")
+        cursor.execute(f"ALTER TABLE {table_name} ADD INDEX idx_{column_name} ({column_name})")
+    cursor.close()
+    return added
+
+
+def primary_key_column(connection):
+
+    """
+    Returns the name of the orders table's primary key column ("id" when it cannot be found).
+    Args:
+        connection: An open MySQL connection.
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT column_name FROM information_schema.key_column_usage "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND constraint_name = 'PRIMARY' "
+        "ORDER BY ordinal_position",
+        (config['general']['table_name'],),
+    )
+    columns = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    return columns[0] if len(columns) == 1 else "id"
+
+
+def ensure_key_hash_column(connection, batch_size=FETCH_BATCH_SIZE):
+
+    """
+    Makes sure the orders table has an indexed `key_hash` column and a
+    `content_hash` column, and that every row has its key fingerprint filled in.
+    The columns and index are added on first use. Rows inserted before that (or
+    by other tools) are backfilled `batch_size` rows at a time: their primary key
+    and key columns are read through the `key_hash` index, hashed in pandas and
+    written back with `UPDATE ... WHERE <primary key> = %s`, so no statement scans
+    the table.
+    Args:
+        connection: An open MySQL connection.
+        batch_size (int): Rows hashed and updated per batch.
+    """
+
+    import pandas as pd
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    table_name = config['general']['table_name']
+
+    ensure_column(connection, "key_hash", "CHAR(40) NULL", index=True)
+    ensure_index(connection, "key_hash")
+    # Written by every insert, whether or not `[updates]` is enabled
+    ensure_column(connection, "content_hash", "CHAR(40) NULL")
+
+    primary_key = primary_key_column(connection)
+    select_query = (f"SELECT {primary_key}, {', '.join(KEY_COLUMNS)} FROM {table_name} "
+                    f"WHERE key_hash IS NULL LIMIT {int(batch_size)}")
+    update_query = f"UPDATE {table_name} SET key_hash = %s WHERE {primary_key} = %s"
+
+    cursor = connection.cursor()
+    backfilled = 0
+    while True:
+        cursor.execute(select_query)
+        batch = cursor.fetchall()
+        if not batch:
+            break
+        missing = pd.DataFrame(batch, columns=[primary_key, *KEY_COLUMNS])
+        cursor.executemany(update_query, list(zip(key_fingerprint(missing), missing[primary_key].tolist())))
+        connection.commit()
+        backfilled += len(missing)
+        print(f"Backfilled key_hash for {backfilled} rows")
+    cursor.close()
+
+
+def fetch_key_hashes(connection, where=None):
+
+    """
+    Fetches the key fingerprints stored in the orders table.
+    Only the indexed `key_hash` column is transferred, so memory and network use
+    scale with the number of orders rather than the size of the table.
+    Args:
+        connection: An open MySQL connection.
+        where (str, optional): Extra SQL condition, e.g. "removal_date IS NULL".
+    Returns:
+        set: The fingerprints.
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    query = f"SELECT key_hash FROM {config['general']['table_name']} WHERE key_hash IS NOT NULL"
+    if where:
+        query += f" AND ({where})"
+
+    cursor = connection.cursor()
+    cursor.execute(query)
+    hashes = set()
+    while True:
+        batch = cursor.fetchmany(FETCH_BATCH_SIZE)
+        if not batch:
+            break
+        hashes.update(row[0] for row in batch)
+    cursor.close()
+    return hashes
@@ -0,0 +1,125 @@
+# pandas is imported where it is used so that importing the scraper stays cheap
+
+# The documented order fields (database column names) and how they are stored in memory:
+#   category - few distinct values repeated on every row (dictionary encoded)
+#   code     - identifiers that must stay exact text (no float or date inference)
+#   text     - free text
+#   date     - kept as the site's text; a parsed copy goes to `order_date_value`
+ORDER_SCHEMA = {
+    'office': 'category',
+    'order_type': 'category',
+    'order_no': 'code',
+    'order_date': 'date',
+    'name_of_party': 'text',
+    'ra_file_no': 'code',
+    'category': 'category',
+    'iec': 'code',
+    'issued_by': 'category',
+    'text_of_order': 'text',
+    'attachment': 'text',
+}
+
+# Parsed order date, added next to `order_date` (not stored in MySQL)
+ORDER_DATE_VALUE = 'order_date_value'
+
+
+def string_dtype():
+
+    """Returns the compact Arrow-backed string dtype, or pandas' default string dtype without pyarrow."""
+
+    import importlib.util
+    import pandas as pd
+
+    if importlib.util.find_spec("pyarrow") is not None:
+        return pd.StringDtype("pyarrow")
+    return pd.StringDtype()
+
+
+def normalise_header(header):
+
+    """Converts a table header to its database column name, e.g. "RA File No" -> "ra_file_no"."""
+
+    return str(header).strip().lower().replace(' ', '_').replace('.', '')
+
+
+def parse_order_dates(values):
+
+    """
+    Parses order dates in one vectorised pass.
+    Both formats the site has used are accepted: "DD/MM/YYYY" and "YYYY-MM-DD"
+    (with or without a time part). Anything else becomes NaT.
+    Args:
+        values (pd.Series): Order dates as text (or already parsed datetimes).
+    Returns:
+        pd.Series: datetime64 values aligned with `values`.
+    """
+
+    import pandas as pd
+
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    text = values.astype(object).where(values.notna(), "").astype(str).str.strip().str.slice(0, 10)
+    parsed = pd.to_datetime(text, format="%d/%m/%Y", errors="coerce")
+    iso = parsed.isna()
+    if iso.any():
+        parsed[iso] = pd.to_datetime(text[iso], format="%Y-%m-%d", errors="coerce")
+    return parsed
+
+
+def to_code(values):
+
+    """
+    Converts an identifier column to exact text with surrounding whitespace removed.
+    The value itself is kept as listed (e.g. "123.0" stays "123.0"): identifiers
+    go into the `order_keys` fingerprints, which must match the stored ones.
+    """
+
+    text = values.astype(object).where(values.notna(), None)
+    text = text.map(lambda value: value if value is None else str(value).strip())
+    return text.astype(string_dtype())
+
+
+def apply_schema(df):
+
+    """
+    Gives the order columns of a frame their compact, explicit dtypes.
+    Low-cardinality columns become categoricals, identifiers become exact strings,
+    free text uses the Arrow string dtype, and `order_date_value` holds the parsed
+    `order_date`. Columns may carry the site's headers ("Order No") or database
+    names ("order_no"); other columns are left alone. Values are not rewritten
+    beyond trimming whitespace, which the fingerprints (`order_keys`) already
+    ignore, so `key_hash` and `content_hash` are the same before and after.
+    Args:
+        df (pd.DataFrame): Frame to convert in place.
+    Returns:
+        pd.DataFrame: The same frame.
+    """
+
+    for column in list(df.columns):
+        kind = ORDER_SCHEMA.get(normalise_header(column))
+        if kind == 'category':
+            df[column] = df[column].astype(object).where(df[column].notna(), None).astype('category')
+        elif kind == 'code':
+            df[column] = to_code(df[column])
+        elif kind in ('text', 'date'):
+            if kind == 'date':
+                df[ORDER_DATE_VALUE] = parse_order_dates(df[column])
+            df[column] = df[column].astype(object).where(df[column].notna(), None).astype(string_dtype())
+    return df
+
+
+def to_storage(df):
+
+    """
+    Returns a copy of `df` that Parquet writers can append chunk after chunk:
+    categorical and object columns are stored as plain strings, so every chunk has
+    the same schema whatever categories it happens to contain.
+    """
+
+    import pandas as pd
+
+    text_columns = {
+        column: "string" for column in df.columns
+        if df[column].dtype == object or isinstance(df[column].dtype, pd.CategoricalDtype)
+    }
+    return df.astype(text_columns)
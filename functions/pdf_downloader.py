@@ -0,0 +1,445 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import configparser
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from functions import download_session
+
+
+class TokenBucket:
+
+    """
+    Thread-safe token bucket: `rate` tokens per second, holding at most `capacity`.
+    Args:
+        rate (float): Tokens added per second.
+        capacity (float): Largest burst allowed.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+
+        """Blocks until a token is available and takes it."""
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+
+    """
+    Keeps one `TokenBucket` per host, so each host is limited on its own.
+    Args:
+        rate (float): Requests per second allowed to one host.
+        burst (float): Requests one host may receive back to back.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, url):
+
+        """Blocks until a request to the host of `url` is allowed."""
+
+        host = urlsplit(url).netloc.lower()
+        with self.lock:
+            bucket = self.buckets.setdefault(host, TokenBucket(self.rate, self.burst))
+        bucket.acquire()
+
+
+_limiter = None
+
+
+def get_rate_limiter():
+
+    """
+    Returns the run's shared `HostRateLimiter`, created on first use, so the
+    per-host buckets carry over from one chunk to the next.
+    """
+
+    global _limiter
+    if _limiter is None:
+        settings = get_download_settings()
+        _limiter = HostRateLimiter(settings["per_host_rate"], settings["per_host_burst"])
+    return _limiter
+
+
+def get_download_settings():
+
+    """
+    Reads the `[downloads]` section of config.ini.
+    Returns:
+        dict: max_in_flight, per_host_rate, per_host_burst, connect_timeout,
+              read_timeout, file_timeout, chunk_size (bytes) and resume.
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    return {
+        "max_in_flight": config.getint('downloads', 'max_in_flight', fallback=4),
+        "per_host_rate": config.getfloat('downloads', 'per_host_rate', fallback=1.0),
+        "per_host_burst": config.getfloat('downloads', 'per_host_burst', fallback=2),
+        "connect_timeout": config.getfloat('downloads', 'connect_timeout', fallback=10),
+        "read_timeout": config.getfloat('downloads', 'read_timeout', fallback=60),
+        "file_timeout": config.getfloat('downloads', 'file_timeout', fallback=300),
+        "chunk_size": config.getint('downloads', 'chunk_size_kb', fallback=64) * 1024,
+        "resume": config.getboolean('downloads', 'resume', fallback=True),
+    }
+
+
+class IncompleteDownload(requests.exceptions.ChunkedEncodingError):
+
+    """The body ended before the size the server announced (retried like a reset)."""
+
+
+def get_part_path(pdf_url, local_path):
+
+    """
+    Returns where a download of `pdf_url` to `local_path` is written until complete:
+    "<local_path>.<first 12 hex digits of the URL's SHA-1>.part". Keying it on the URL
+    keeps two URLs that plan to the same file name from sharing a .part file.
+    """
+
+    return f"{local_path}.{hashlib.sha1(pdf_url.encode('utf-8')).hexdigest()[:12]}.part"
+
+
+def load_partial(pdf_url, local_path):
+
+    """
+    Finds a partial download that can be resumed.
+    A partial download is the .part file (see `get_part_path`) plus its ".part.json"
+    sidecar, which records the URL, the bytes received and the ETag/Last-Modified
+    validators.
+    Args:
+        pdf_url (str): The attachment URL.
+        local_path (str): The final path.
+    Returns:
+        dict: The sidecar with 'bytes' set to the size of the .part file, or None
+              when there is nothing usable to resume (the leftovers are removed).
+    """
+
+    part_path = get_part_path(pdf_url, local_path)
+    try:
+        with open(f"{part_path}.json") as sidecar_file:
+            partial = json.load(sidecar_file)
+        partial["bytes"] = os.path.getsize(part_path)
+    except (OSError, ValueError):
+        discard_partial(part_path)
+        return None
+
+    if partial.get("url") != pdf_url or not partial["bytes"] or not if_range_validator(partial):
+        discard_partial(part_path)
+        return None
+    return partial
+
+
+def save_partial(part_path, partial):
+
+    """Writes the sidecar of a partial download (see `load_partial`)."""
+
+    sidecar_path = f"{part_path}.json"
+    with open(f"{sidecar_path}.tmp", 'w') as sidecar_file:
+        json.dump(partial, sidecar_file)
+    os.replace(f"{sidecar_path}.tmp", sidecar_path)
+
+
+def discard_partial(part_path):
+
+    """Removes a .part file and its sidecar, if any."""
+
+    for path in (part_path, f"{part_path}.json"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def if_range_validator(partial):
+
+    """
+    Returns the validator to send in If-Range: the ETag when it is a strong one,
+    otherwise Last-Modified (weak ETags are not allowed in If-Range), or None.
+    """
+
+    etag = partial.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return partial.get("last_modified")
+
+
+def stream_to_file(response, part_path, local_path, settings, deadline, offset=0, store=None):
+
+    """
+    Streams a response body to `local_path` without holding it in memory.
+    The body is written in fixed `chunk_size` blocks to `part_path`, and
+    only renamed over `local_path` (atomically, with `os.replace`) once every byte
+    the server announced in Content-Length has arrived and been flushed to disk.
+    A crash or error part-way through therefore never leaves a truncated PDF at
+    the final path, where the "already exists" check would accept it.
+    With `offset`, the body is a 206 range appended to the bytes already in the
+    .part file. The .part file is left in place on errors; the caller decides
+    whether it is kept for resuming.
+    The SHA-256 is computed block by block as the body is written (the bytes of a
+    resumed .part file are hashed first). With a `store`, the complete file goes
+    into the store and `local_path` becomes a link to it (see `pdf_store.PdfStore`).
+    Args:
+        response (requests.Response): A streamed 200 or 206 response.
+        part_path (str): The .part file (see `get_part_path`).
+        local_path (str): The final path.
+        settings (dict): From `get_download_settings`.
+        deadline (float): `time.monotonic()` value the transfer must finish by.
+        offset (int): Bytes already in the .part file that `response` continues.
+        store (pdf_store.PdfStore, optional): Content-addressed store to keep the file in.
+    Returns:
+        str: SHA-256 of the complete file.
+    Raises:
+        IncompleteDownload: If fewer or more bytes arrived than announced.
+        TimeoutError: If the transfer passes `deadline`.
+    """
+
+    sha256 = hashlib.sha256()
+    if offset:
+        with open(part_path, 'rb') as part_file:
+            for block in iter(lambda: part_file.read(settings["chunk_size"]), b""):
+                sha256.update(block)
+    with open(part_path, 'ab' if offset else 'wb') as part_file:
+        for chunk in response.iter_content(chunk_size=settings["chunk_size"]):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"took longer than {settings['file_timeout']:.0f}s")
+            sha256.update(chunk)
+            part_file.write(chunk)
+        part_file.flush()
+        os.fsync(part_file.fileno())
+
+    # Bytes as sent, before any Content-Encoding was undone
+    received = response.raw.tell()
+    expected = response.headers.get("Content-Length")
+    if expected is not None and expected.isdigit() and received != int(expected):
+        raise IncompleteDownload(f"received {received} of {expected} bytes")
+
+    digest = sha256.hexdigest()
+    if store:
+        store.add(part_path, digest)
+        store.place(digest, local_path)
+    else:
+        os.replace(part_path, local_path)
+    return digest
+
+
+def content_range_start(response):
+
+    """Returns the first byte of a 206 response's Content-Range ("bytes 500-999/1000"), or None."""
+
+    content_range = response.headers.get("Content-Range", "")
+    unit, _, byte_range = content_range.partition(" ")
+    start = byte_range.split("-", 1)[0]
+    return int(start) if unit == "bytes" and start.isdigit() else None
+
+
+def download_file(pdf_url, local_path, settings, session=None, policy=None, store=None, limiter=None):
+
+    """
+    Downloads one attachment, retrying transient failures.
+    `connect_timeout`/`read_timeout` bound each network wait and `file_timeout`
+    bounds each transfer, so a server trickling bytes cannot hold a worker.
+    Every request, retries and restarts included, first takes a token from the
+    per-host `limiter`. 5xx and 429 responses, connection resets, timeouts and short bodies are retried
+    as `policy` decides (exponential backoff with jitter, or the server's Retry-After).
+    The file appears at `local_path` only when complete (see `stream_to_file`).
+    With `[downloads] resume`, an interrupted transfer keeps its .part file and a
+    sidecar (see `load_partial`), and the next attempt - in this run or a later
+    one - asks only for the missing bytes with `Range` and `If-Range`. When the
+    server answers 200 instead (no range support, or the file changed since) the
+    download restarts from the first byte. The .part file is only discarded when
+    the server rejects it (a 416, or a 200/206 that does not continue it), never
+    because the server could not be reached.
+    With a `store`, the file is kept once per content and recorded in its manifest.
+    A URL the store already holds is requested with If-None-Match/If-Modified-Since;
+    on 304 Not Modified the stored blob is linked instead of downloaded again.
+    Args:
+        pdf_url (str): The attachment URL.
+        local_path (str): Where to save it.
+        settings (dict): From `get_download_settings`.
+        session (requests.Session, optional): Session to use; plain `requests` otherwise.
+        policy (download_session.RetryPolicy, optional): Retry policy; the run's shared one otherwise.
+        store (pdf_store.PdfStore, optional): Content-addressed store to keep the file in.
+        limiter (HostRateLimiter, optional): Per-host rate limit; the run's shared one otherwise.
+    Returns:
+        str: None on success, otherwise why the download failed.
+    """
+
+    http = session or requests
+    policy = policy or download_session.get_retry_policy()
+    limiter = limiter or get_rate_limiter()
+    attempt = 0
+    while True:
+        limiter.acquire(pdf_url)
+        policy.record_request()
+        deadline = time.monotonic() + settings["file_timeout"]
+        part_path = get_part_path(pdf_url, local_path)
+        partial = load_partial(pdf_url, local_path) if settings["resume"] else None
+        # Ranges count bytes as sent, so ask for the file without Content-Encoding
+        headers = {"Accept-Encoding": "identity"}
+        known = store.lookup(pdf_url) if store and not partial else None
+        if partial:
+            headers["Range"] = f"bytes={partial['bytes']}-"
+            headers["If-Range"] = if_range_validator(partial)
+        elif known:
+            if known.get("etag"):
+                headers["If-None-Match"] = known["etag"]
+            if known.get("last_modified"):
+                headers["If-Modified-Since"] = known["last_modified"]
+        resumable = False
+        offset = None
+        try:
+            with http.get(pdf_url, headers=headers, stream=True,
+                          timeout=(settings["connect_timeout"], settings["read_timeout"])) as response:
+                if response.status_code == 304 and known:
+                    store.place(known["sha256"], local_path)
+                    store.record(pdf_url, known["sha256"], local_path, known.get("etag"), known.get("last_modified"))
+                    print(f"Unchanged since the last download, linked: {local_path}")
+                    return None
+                if response.status_code == 416 and partial:
+                    # The range is past the end: the file is no longer the one we started
+                    discard_partial(part_path)
+                    continue
+                if partial and response.status_code == 206 and content_range_start(response) == partial["bytes"]:
+                    offset = partial["bytes"]
+                    print(f"Resuming {pdf_url} from byte {offset}")
+                elif response.status_code == 200 and not partial:
+                    offset = 0
+                elif partial and response.status_code in (200, 206):
+                    # Range ignored or the file changed since: start again from the first byte
+                    print(f"Restarting {pdf_url}: the server did not resume from byte {partial['bytes']}")
+                    discard_partial(part_path)
+                    offset = 0
+                    if response.status_code == 206:
+                        continue
+                else:
+                    delay = policy.retry_delay(attempt, response=response)
+                    if delay is None:
+                        policy.record_failure()
+                        return f"Status Code: {response.status_code}"
+
+                if offset is not None:
+                    validators = {
+                        "etag": response.headers.get("ETag") or (partial or {}).get("etag"),
+                        "last_modified": response.headers.get("Last-Modified") or (partial or {}).get("last_modified"),
+                    }
+                    resumable = settings["resume"] and (
+                        response.status_code == 206 or response.headers.get("Accept-Ranges") == "bytes"
+                    ) and bool(if_range_validator(validators))
+                    if resumable:
+                        save_partial(part_path, {"url": pdf_url, "bytes": offset, **validators})
+                    digest = stream_to_file(response, part_path, local_path, settings, deadline, offset, store)
+                    discard_partial(part_path)
+                    if store:
+                        store.record(pdf_url, digest, local_path, validators["etag"], validators["last_modified"])
+                    return None
+        except Exception as e:
+            # Before a body was accepted (connection errors, header timeouts) a
+            # partial download is left as it was, for the next attempt to resume
+            if offset is not None:
+                if resumable and os.path.exists(part_path):
+                    save_partial(part_path, {"url": pdf_url, "bytes": os.path.getsize(part_path), **validators})
+                else:
+                    discard_partial(part_path)
+            delay = policy.retry_delay(attempt, error=e)
+            if delay is None:
+                policy.record_failure()
+                return str(e)
+        print(f"Retrying {pdf_url} in {delay:.1f}s (attempt {attempt + 2} of {policy.max_retries + 1})")
+        time.sleep(delay)
+        attempt += 1
+
+
+def download_planned(plan, row_offset=0, session=None, store=None):
+
+    """
+    Downloads the attachments of a planned chunk (see `download_pdf.plan_pdf_paths`)
+    with a bounded number of requests in flight and a token-bucket rate limit per host.
+    Rows whose file already exists are resolved without touching the network or
+    waiting, as are rows whose URL was already fetched during this run. Each URL is
+    fetched once per chunk; other rows with the same URL are linked to the stored
+    copy (or downloaded after it, without a store). All workers share one keep-alive
+    session (`download_session.get_session`) unless `session` is given. Results are
+    keyed by the plan's index, so callers write them back in input order whatever
+    order the downloads finish in.
+    Args:
+        plan (pd.DataFrame): Rows with pdf_url, pdf_name, local_path, pdf_path and skip.
+        row_offset (int): Rows processed in earlier chunks (for progress output).
+        session (requests.Session, optional): Session shared by the workers; the run's pooled one otherwise.
+        store (pdf_store.PdfStore, optional): Content-addressed store (see `pdf_store.get_store`).
+    Returns:
+        dict: index -> (pdf_name, pdf_path) for every row whose file is now on disk.
+    """
+
+    settings = get_download_settings()
+    session = session or download_session.get_session()
+    limiter = get_rate_limiter()
+
+    results = {}
+    # pdf_url -> rows still to download, the first of which is fetched
+    pending = {}
+    for index, row in plan.iterrows():
+        if row["skip"]:
+            print(f"Skipping row {row_offset + index + 1}: {row['skip']}")
+        elif os.path.exists(row["local_path"]):
+            print(f"Skipping: {row['pdf_name']} already exists.")
+            results[index] = (row["pdf_name"], row["pdf_path"])
+        elif store and store.link_known(row["pdf_url"], row["local_path"]):
+            print(f"Linked: {row['pdf_name']} (already downloaded in this run)")
+            results[index] = (row["pdf_name"], row["pdf_path"])
+        else:
+            pending.setdefault(row["pdf_url"], []).append((index, row))
+
+    def fetch(rows):
+        errors = {}
+        for index, row in rows:
+            if os.path.exists(row["local_path"]) or (store and store.link_known(row["pdf_url"], row["local_path"])):
+                errors[index] = None
+                continue
+            errors[index] = download_file(row["pdf_url"], row["local_path"], settings, session, store=store, limiter=limiter)
+        return errors
+
+    started = time.perf_counter()
+    total = sum(len(rows) for rows in pending.values())
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, settings["max_in_flight"])) as executor:
+        futures = {executor.submit(fetch, rows): rows for rows in pending.values()}
+        for future in as_completed(futures):
+            errors = future.result()
+            for index, row in futures[future]:
+                if errors[index]:
+                    failed += 1
+                    print(f"Failed to download {row['pdf_url']} ({errors[index]})")
+                else:
+                    print(f"{row_offset + index + 1}. Downloaded: {row['pdf_name']}")
+                    results[index] = (row["pdf_name"], row["pdf_path"])
+
+    if pending:
+        elapsed = time.perf_counter() - started
+        print(f"Downloaded {total - failed} of {total} PDFs ({len(pending)} distinct URLs) in {elapsed:.1f}s "
+              f"({settings['max_in_flight']} in flight, {settings['per_host_rate']:g}/s per host)")
+    return results
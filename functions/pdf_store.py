@@ -0,0 +1,220 @@
+import os
+import json
+import shutil
+import hashlib
+import argparse
+import threading
+import configparser
+
+
+class PdfStore:
+
+    """
+    Content-addressed store for the downloaded attachments.
+    Each distinct PDF is kept once, as "<store_dir>/<first two hex digits>/<sha256>.pdf".
+    The year/month paths chosen by `download_pdf.plan_pdf_paths` (and stored in MySQL
+    as pdf_path) stay where they are, as hard links to the blob, so the same order
+    PDF linked from several rows or re-dated by the listing takes the disk space once.
+    Where the filesystem has no hard links the blob is copied to the path instead.
+    `manifest.jsonl` records, for every path placed, the attachment URL, the path,
+    the blob's SHA-256 and the server's ETag/Last-Modified. A URL already in the
+    manifest is revalidated with a conditional request (see
+    `pdf_downloader.download_file`) and only linked without downloading when the
+    server answers 304 Not Modified; changed content is downloaded and stored
+    as a new blob.
+    Args:
+        store_dir (str): Folder of the store.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.manifest_path = os.path.join(store_dir, "manifest.jsonl")
+        self.lock = threading.Lock()
+        # attachment URL -> {"sha256", "etag", "last_modified"} of its last download
+        self.urls = {}
+        # URLs downloaded or revalidated during this run
+        self.fetched = set()
+
+        os.makedirs(store_dir, exist_ok=True)
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as manifest_file:
+                for line in manifest_file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash
+                        continue
+                    if entry.get("url"):
+                        self.urls[entry["url"]] = entry
+
+    def blob_path(self, digest):
+
+        """Returns where the blob with SHA-256 `digest` is kept."""
+
+        return os.path.join(self.store_dir, digest[:2], f"{digest}.pdf")
+
+    def lookup(self, pdf_url):
+
+        """
+        Returns the manifest entry of `pdf_url` ("sha256", "etag", "last_modified")
+        when its blob is still there, else None.
+        """
+
+        entry = self.urls.get(pdf_url)
+        if entry and os.path.exists(self.blob_path(entry["sha256"])):
+            return entry
+        return None
+
+    def add(self, file_path, digest):
+
+        """
+        Moves a complete download into the store.
+        If the blob already exists the content is a duplicate and `file_path` is removed.
+        Args:
+            file_path (str): The downloaded file (e.g. the .part file).
+            digest (str): Its SHA-256, computed while it was written.
+        Returns:
+            bool: True when the content was new.
+        """
+
+        blob_path = self.blob_path(digest)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        with self.lock:
+            if os.path.exists(blob_path):
+                os.remove(file_path)
+                return False
+            os.replace(file_path, blob_path)
+            return True
+
+    def place(self, digest, local_path):
+
+        """
+        Puts the blob at `local_path` as a hard link (or a copy), replacing whatever is there atomically.
+        """
+
+        blob_path = self.blob_path(digest)
+        # One temporary name per thread, in case two workers place the same path
+        temp_path = f"{local_path}.{threading.get_ident()}.link"
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        try:
+            os.link(blob_path, temp_path)
+        except OSError:
+            shutil.copyfile(blob_path, temp_path)
+        os.replace(temp_path, local_path)
+
+    def record(self, pdf_url, digest, local_path, etag=None, last_modified=None):
+
+        """Appends a manifest entry for `local_path` and remembers the URL's content and validators."""
+
+        entry = {"sha256": digest, "url": pdf_url, "path": local_path.replace("\\", "/"),
+                 "etag": etag, "last_modified": last_modified}
+        with self.lock:
+            if pdf_url:
+                self.urls[pdf_url] = entry
+                self.fetched.add(pdf_url)
+            with open(self.manifest_path, 'a') as manifest_file:
+                manifest_file.write(json.dumps(entry) + "\n")
+
+    def link_known(self, pdf_url, local_path):
+
+        """
+        Places a PDF whose URL was already downloaded or revalidated during this run
+        at `local_path`, without another request.
+        Returns:
+            bool: False when the URL has not been fetched in this run.
+        """
+
+        entry = self.lookup(pdf_url) if pdf_url in self.fetched else None
+        if entry is None:
+            return False
+        self.place(entry["sha256"], local_path)
+        self.record(pdf_url, entry["sha256"], local_path, entry.get("etag"), entry.get("last_modified"))
+        return True
+
+
+def file_sha256(file_path, chunk_size=64 * 1024):
+
+    """Returns the SHA-256 of a file, read in fixed-size blocks."""
+
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as pdf_file:
+        for block in iter(lambda: pdf_file.read(chunk_size), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+# The store of each download folder, opened once per run
+stores = {}
+
+
+def get_store(download_folder):
+
+    """
+    Returns the store of a download folder (`[pdf_store]` in config.ini), or None when it is disabled.
+    Args:
+        download_folder (str): The ras_sez folder under `[file_paths] base_folder`.
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    if not config.getboolean('pdf_store', 'enabled', fallback=False):
+        return None
+    store_dir = os.path.join(download_folder, config.get('pdf_store', 'store_folder', fallback='_store'))
+    if store_dir not in stores:
+        stores[store_dir] = PdfStore(store_dir)
+    return stores[store_dir]
+
+
+def adopt_existing(download_folder):
+
+    """
+    Moves PDFs downloaded before the store existed into it.
+    Every .pdf under the year/month folders is hashed, moved into the store (or
+    dropped when the store already holds the same content) and replaced by a hard
+    link, so the paths in MySQL keep working. Attachment URLs are not known for
+    these files, so they are recorded without one.
+    Args:
+        download_folder (str): The ras_sez folder under `[file_paths] base_folder`.
+    Returns:
+        tuple: (files adopted, duplicates removed)
+    """
+
+    store = get_store(download_folder)
+    if store is None:
+        raise ValueError("The PDF store is disabled ([pdf_store] enabled)")
+
+    adopted = duplicates = 0
+    for folder, sub_folders, file_names in os.walk(download_folder):
+        if os.path.abspath(folder).startswith(os.path.abspath(store.store_dir)):
+            continue
+        for file_name in file_names:
+            if not file_name.lower().endswith(".pdf"):
+                continue
+            local_path = os.path.join(folder, file_name)
+            digest = file_sha256(local_path)
+            if os.path.exists(store.blob_path(digest)) and os.path.samefile(local_path, store.blob_path(digest)):
+                continue
+            moved_path = f"{local_path}.adopt"
+            os.replace(local_path, moved_path)
+            if not store.add(moved_path, digest):
+                duplicates += 1
+            store.place(digest, local_path)
+            store.record(None, digest, local_path)
+            adopted += 1
+    print(f"Adopted {adopted} PDFs into {store.store_dir} ({duplicates} duplicates removed)")
+    return adopted, duplicates
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Content-addressed store of the downloaded PDFs")
+    sub_parsers = arg_parser.add_subparsers(dest="command", required=True)
+    adopt_parser = sub_parsers.add_parser("adopt", help="move already downloaded PDFs into the store")
+    adopt_parser.add_argument("download_folder", nargs="?", help="ras_sez folder (default: base_folder/ras_sez)")
+    args = arg_parser.parse_args()
+
+    if args.command == "adopt":
+        config = configparser.ConfigParser()
+        config.read('config.ini')
+        adopt_existing(args.download_folder or os.path.join(config['file_paths']['base_folder'], "ras_sez"))
@@ -0,0 +1,94 @@
+import os
+import re
+import glob
+import argparse
+import configparser
+from datetime import datetime
+
+import log_details
+
+
+# Each stage that can be replayed, with the snapshot it starts from
+REPLAY_STAGES = {
+    "diff": ("first_excel_sheet_path", "first_excel_sheet"),
+    "download": ("increment_data_excel_path", "incremental_excel_sheet"),
+    "insert": ("final_excel_sheet_path", "final_excel_sheet"),
+}
+
+
+def latest_snapshot(stage):
+
+    """
+    Finds the newest snapshot a stage can be replayed from.
+    Args:
+        stage (str): "diff", "download" or "insert".
+    Returns:
+        str: Path of the newest .parquet or .xlsx snapshot in the stage's folder.
+    Raises:
+        FileNotFoundError: If the folder holds no snapshot.
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    path_option, sheet_name = REPLAY_STAGES[stage]
+    folder = config['file_paths'][path_option]
+    snapshots = [
+        path for extension in ("parquet", "xlsx")
+        for path in glob.glob(os.path.join(folder, f"{sheet_name}_*.{extension}"))
+    ]
+    if not snapshots:
+        raise FileNotFoundError(f"No {sheet_name} snapshot in {folder}")
+    # Dated names sort chronologically; parquet wins over xlsx written the same day
+    return max(snapshots, key=lambda path: (os.path.basename(path).rsplit(".", 1)[0], path.endswith(".parquet")))
+
+
+def replay(stage, snapshot_path=None):
+
+    """
+    Runs the pipeline from a stage onwards, starting from an existing snapshot.
+    Nothing imports or starts Selenium: the stage function is called with the
+    snapshot path, and the later stages follow as in a normal run. Use it to
+    recover from a failed PDF download or DB insert without re-scraping.
+        - diff: `check_increment_data` on a first_excel_sheet snapshot
+        - download: `download_pdf` on an incremental_excel_sheet snapshot
+        - insert: `insert_final_data_to_mysql` on a final_excel_sheet snapshot
+    Deleted orders are only marked when a diff is replayed from today's
+    snapshot; an older listing would make orders added since look deleted.
+    Args:
+        stage (str): "diff", "download" or "insert".
+        snapshot_path (str, optional): Snapshot to start from. Defaults to the newest one.
+    Example:
+        >>> replay("insert")
+        >>> replay("diff", "data/first_excel_sheet/first_excel_sheet_2025-04-11.xlsx")
+    """
+
+    print("replay function is called")
+
+    if stage not in REPLAY_STAGES:
+        raise ValueError(f"Unknown stage: {stage} (expected one of {', '.join(REPLAY_STAGES)})")
+
+    snapshot_path = snapshot_path or latest_snapshot(stage)
+    print(f"Replaying {stage} from {snapshot_path}")
+
+    if stage == "diff":
+        match = re.search(r"(\d{4}-\d{2}-\d{2})", os.path.basename(snapshot_path))
+        if not match or match.group(1) != datetime.now().strftime("%Y-%m-%d"):
+            print("Snapshot is not from today, deleted orders will not be marked")
+            log_details.full_crawl = False
+        from functions import check_increment_data
+        check_increment_data.check_increment_data(snapshot_path)
+    elif stage == "download":
+        from functions import download_pdf
+        download_pdf.download_pdf(snapshot_path)
+    else:
+        from functions import insert_final_data_to_mysql
+        insert_final_data_to_mysql.insert_final_data_to_mysql(snapshot_path)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Rerun the pipeline from an archived snapshot, without the browser")
+    arg_parser.add_argument("stage", choices=list(REPLAY_STAGES), help="stage to start from")
+    arg_parser.add_argument("snapshot", nargs="?", help="snapshot path (default: the newest one for the stage)")
+    args = arg_parser.parse_args()
+    replay(args.stage, args.snapshot)
@@ -0,0 +1,230 @@
+import os
+import csv
+import json
+import time
+import glob
+import shutil
+import configparser
+
+
+# pandas is imported where it is used so that importing the scraper stays cheap
+
+
+class RowSink:
+
+    """
+    Append-only spool for scraped table rows.
+    Each page of rows is written exactly once to a chunked spool file (CSV, JSONL
+    or Parquet) instead of rebuilding a DataFrame and rewriting the whole Excel
+    sheet after every page. `finish()` reads the spool back once and returns the
+    rows as a DataFrame.
+    Args:
+        spool_dir (str): Directory holding the spool chunks for this run.
+        spool_format (str): One of "csv", "jsonl" or "parquet".
+        chunk_rows (int): Rows per chunk file before a new one is started.
+        resume (bool): Keep rows already spooled in `spool_dir` instead of clearing it.
+    Example:
+        >>> sink = RowSink("data/spool/first_excel_sheet_2025-04-02")
+        >>> sink.write_page(1, headers, rows)
+        >>> df = sink.finish()
+    """
+
+    def __init__(self, spool_dir, spool_format="csv", chunk_rows=10000, resume=False):
+        if spool_format not in ("csv", "jsonl", "parquet"):
+            raise ValueError(f"Unsupported spool format: {spool_format}")
+
+        self.spool_dir = spool_dir
+        self.spool_format = spool_format
+        self.chunk_rows = chunk_rows
+        self.headers = None
+        self.pages_written = 0
+        self.rows_written = 0
+        self.started_at = time.perf_counter()
+
+        if not resume and os.path.isdir(spool_dir):
+            shutil.rmtree(spool_dir)
+        os.makedirs(spool_dir, exist_ok=True)
+
+        self._chunk_index = len(self._chunk_paths())
+        self._chunk_fill = 0
+        headers_path = os.path.join(spool_dir, "headers.json")
+        if os.path.exists(headers_path):
+            with open(headers_path, encoding="utf-8") as f:
+                self.headers = json.load(f)
+            self.rows_written = sum(len(self._read_chunk(path)) for path in self._chunk_paths())
+
+    def _chunk_paths(self):
+        return sorted(glob.glob(os.path.join(self.spool_dir, f"chunk_*.{self.spool_format}")))
+
+    def _chunk_path(self):
+        return os.path.join(self.spool_dir, f"chunk_{self._chunk_index:05d}.{self.spool_format}")
+
+    def _read_chunk(self, path):
+        import pandas as pd
+
+        if self.spool_format == "csv":
+            return pd.read_csv(path, header=None, names=self.headers, dtype=str, keep_default_na=False)
+        if self.spool_format == "jsonl":
+            with open(path, encoding="utf-8") as f:
+                return pd.DataFrame([json.loads(line) for line in f], columns=self.headers)
+        return pd.read_parquet(path)
+
+    def write_page(self, page, headers, rows):
+
+        """
+        Appends the rows of one scraped page to the spool.
+        Args:
+            page (int): The page number the rows came from (used for progress output).
+            headers (list): Column names of the table.
+            rows (list): The page's rows, each a list of cell values.
+        """
+
+        if self.headers is None:
+            self.headers = list(headers)
+            with open(os.path.join(self.spool_dir, "headers.json"), "w", encoding="utf-8") as f:
+                json.dump(self.headers, f)
+
+        remaining = list(rows)
+        while remaining:
+            if self._chunk_fill >= self.chunk_rows:
+                self._chunk_index += 1
+                self._chunk_fill = 0
+            take = remaining[:self.chunk_rows - self._chunk_fill]
+            remaining = remaining[len(take):]
+            self._append_to_chunk(take)
+            self._chunk_fill += len(take)
+            if self.spool_format == "parquet":
+                # Parquet files cannot be appended to, so every write closes its chunk
+                self._chunk_fill = self.chunk_rows
+
+        self.pages_written += 1
+        self.rows_written += len(rows)
+        pages_per_sec, rows_per_sec = self.rates()
+        print(f"Spooled page {page}: {len(rows)} rows "
+              f"({self.rows_written} total, {pages_per_sec:.2f} pages/sec, {rows_per_sec:.1f} rows/sec)")
+
+    def _append_to_chunk(self, rows):
+        path = self._chunk_path()
+        if self.spool_format == "csv":
+            with open(path, "a", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerows(rows)
+        elif self.spool_format == "jsonl":
+            with open(path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        else:
+            import pandas as pd
+
+            pd.DataFrame(rows, columns=self.headers, dtype=str).to_parquet(path, index=False)
+
+    def reset(self):
+
+        """Discards everything spooled so far and starts the spool from scratch."""
+
+        shutil.rmtree(self.spool_dir, ignore_errors=True)
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.headers = None
+        self.pages_written = 0
+        self.rows_written = 0
+        self._chunk_index = 0
+        self._chunk_fill = 0
+
+    def rates(self):
+
+        """
+        Returns the throughput of this sink so far.
+        Returns:
+            tuple: (pages_per_sec, rows_per_sec) since the sink was created.
+        """
+
+        elapsed = max(time.perf_counter() - self.started_at, 1e-9)
+        return self.pages_written / elapsed, self.rows_written / elapsed
+
+    def to_dataframe(self):
+
+        """
+        Reads every spooled chunk back into a single DataFrame.
+        Returns:
+            pd.DataFrame: All spooled rows with the table headers as columns.
+        """
+
+        import pandas as pd
+
+        chunks = [self._read_chunk(path) for path in self._chunk_paths()]
+        if not chunks:
+            return pd.DataFrame(columns=self.headers or [])
+        return pd.concat(chunks, ignore_index=True)
+
+    def iter_chunks(self, chunk_rows, cleanup=True):
+
+        """
+        Reads the spool back in DataFrames of about `chunk_rows` rows, for chunked
+        execution (see `memory_budget`). Only one batch is held at a time.
+        Args:
+            chunk_rows (int): Rows per yielded DataFrame.
+            cleanup (bool): Remove the spool directory once every chunk has been read.
+        Yields:
+            pd.DataFrame: The spooled rows, in order.
+        """
+
+        import pandas as pd
+
+        buffered, buffered_rows = [], 0
+        for path in self._chunk_paths():
+            chunk = self._read_chunk(path)
+            buffered.append(chunk)
+            buffered_rows += len(chunk)
+            if buffered_rows >= chunk_rows:
+                yield pd.concat(buffered, ignore_index=True)
+                buffered, buffered_rows = [], 0
+        if buffered:
+            yield pd.concat(buffered, ignore_index=True)
+
+        pages_per_sec, rows_per_sec = self.rates()
+        print(f"Spool finished: {self.pages_written} pages, {self.rows_written} rows "
+              f"({pages_per_sec:.2f} pages/sec, {rows_per_sec:.1f} rows/sec)")
+        if cleanup:
+            shutil.rmtree(self.spool_dir, ignore_errors=True)
+
+    def finish(self, cleanup=True):
+
+        """
+        Reads the spooled rows back once and reports throughput.
+        Args:
+            cleanup (bool): Remove the spool directory once the rows are read.
+        Returns:
+            pd.DataFrame: The spooled rows, for the next stage (see `snapshot`).
+        """
+
+        df = self.to_dataframe()
+
+        pages_per_sec, rows_per_sec = self.rates()
+        print(f"Spool finished: {self.pages_written} pages, {len(df)} rows "
+              f"({pages_per_sec:.2f} pages/sec, {rows_per_sec:.1f} rows/sec)")
+
+        if cleanup:
+            shutil.rmtree(self.spool_dir, ignore_errors=True)
+        return df
+
+
+def create_row_sink(snapshot_name, resume=False):
+
+    """
+    Creates a RowSink for a snapshot using the `[spool]` settings in config.ini.
+    Args:
+        snapshot_name (str): Name of the snapshot, used as the spool sub-directory.
+        resume (bool): Keep rows already spooled for this snapshot.
+    Returns:
+        RowSink: The configured sink.
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    spool_dir = os.path.join(config.get('spool', 'spool_path', fallback=os.path.join('data', 'spool')), snapshot_name)
+    return RowSink(
+        spool_dir,
+        spool_format=config.get('spool', 'spool_format', fallback='csv'),
+        chunk_rows=config.getint('spool', 'chunk_rows', fallback=10000),
+        resume=resume,
+    )
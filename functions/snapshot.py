@@ -0,0 +1,296 @@
+import os
+import configparser
+from datetime import datetime
+
+
+# pandas is imported where it is used so that importing the scraper stays cheap
+
+SNAPSHOT_FORMATS = ("parquet", "xlsx", "none")
+
+
+def get_snapshot_format():
+
+    """
+    Reads the on-disk snapshot format from `[snapshots] snapshot_format`.
+    Returns:
+        str: "parquet" (default), "xlsx" for the business users, or "none" to skip snapshots.
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    snapshot_format = config.get('snapshots', 'snapshot_format', fallback='parquet').strip().lower()
+    if snapshot_format not in SNAPSHOT_FORMATS:
+        raise ValueError(f"Unsupported snapshot format: {snapshot_format}")
+    return snapshot_format
+
+
+class SnapshotWriter:
+
+    """
+    Writes a snapshot one DataFrame chunk at a time, so a stage never has to
+    hold the whole snapshot to save it.
+    Args:
+        snapshot_path (str): File to write, or None to write no file.
+        snapshot_format (str): "parquet" or "xlsx".
+        archive_name (str, optional): Also add the rows to this `snapshot_archive` dataset.
+    Example:
+        >>> writer = SnapshotWriter("final_excel_sheet_2025-04-11.parquet", "parquet")
+        >>> for df in frames:
+        ...     writer.write(df)
+        >>> writer.close()
+    """
+
+    def __init__(self, snapshot_path, snapshot_format="parquet", archive_name=None):
+        self.snapshot_path = snapshot_path
+        self.snapshot_format = snapshot_format
+        self.rows_written = 0
+        self._writer = None
+        self._schema = None
+        self._archive = None
+        if archive_name:
+            from functions import snapshot_archive
+            self._archive = snapshot_archive.ArchiveWriter(archive_name)
+
+    def write(self, df):
+
+        """Appends one chunk of rows to the snapshot (and the archive)."""
+
+        if self._archive:
+            self._archive.write(df)
+        if self.snapshot_path:
+            if self.snapshot_format == "parquet":
+                self._write_parquet(df)
+            else:
+                self._write_xlsx(df)
+        self.rows_written += len(df)
+
+    def _write_parquet(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        from functions import order_schema
+
+        # Mixed object columns (text plus NaN or numbers) and categoricals are stored as strings
+        table = pa.Table.from_pandas(order_schema.to_storage(df), preserve_index=False)
+        if self._writer is None:
+            # Columns that are empty in the first chunk would otherwise get the null type
+            self._schema = pa.schema([
+                pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field
+                for field in table.schema
+            ])
+            self._writer = pq.ParquetWriter(self.snapshot_path, self._schema)
+        self._writer.write_table(table.cast(self._schema))
+
+    def _write_xlsx(self, df):
+        if self._writer is None:
+            from openpyxl import Workbook
+
+            self._writer = Workbook(write_only=True)
+            self._sheet = self._writer.create_sheet()
+            self._sheet.append([str(column) for column in df.columns])
+        values = df.astype(object).where(df.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            self._sheet.append(list(row))
+
+    def close(self):
+
+        """
+        Finishes the snapshot file and the archive partition.
+        Returns:
+            str: Path of the written snapshot, or None when no file was written.
+        """
+
+        if self._archive:
+            self._archive.close()
+        if not self.snapshot_path:
+            return None
+        if self._writer is None:
+            # No chunk was written; still leave a (header-less) snapshot behind
+            import pandas as pd
+            if self.snapshot_format == "parquet":
+                self._write_parquet(pd.DataFrame())
+            else:
+                self._write_xlsx(pd.DataFrame())
+        if self.snapshot_format == "parquet":
+            self._writer.close()
+        else:
+            self._writer.save(self.snapshot_path)
+        print(f"Data saved to {self.snapshot_path}.")
+        return self.snapshot_path
+
+
+def open_snapshot_writer(path_option, sheet_name):
+
+    """
+    Creates the writer for a stage's dated snapshot from the `[snapshots]` and
+    `[archive]` settings.
+    Args:
+        path_option (str): `[file_paths]` option naming the folder, e.g. "first_excel_sheet_path".
+        sheet_name (str): File name prefix, e.g. "first_excel_sheet".
+    Returns:
+        SnapshotWriter: The writer. It writes no file when `snapshot_format = none`.
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    archive_name = sheet_name if config.getboolean('archive', 'enabled', fallback=False) else None
+    snapshot_format = get_snapshot_format()
+    if snapshot_format == "none":
+        return SnapshotWriter(None, archive_name=archive_name)
+
+    current_date = datetime.now().strftime("%Y-%m-%d")
+    snapshot_path = os.path.join(config['file_paths'][path_option], f"{sheet_name}_{current_date}.{snapshot_format}")
+    return SnapshotWriter(snapshot_path, snapshot_format, archive_name)
+
+
+def write_snapshot(df, path_option, sheet_name):
+
+    """
+    Writes a stage's rows to its dated snapshot file, if snapshots are enabled, and
+    adds them to the partitioned history (`snapshot_archive`) when `[archive] enabled`.
+    Stages hand their DataFrame straight to the next stage; the snapshot is only
+    a side effect kept for auditing and replays.
+    Args:
+        df (pd.DataFrame): The rows to store.
+        path_option (str): `[file_paths]` option naming the folder, e.g. "first_excel_sheet_path".
+        sheet_name (str): File name prefix, e.g. "first_excel_sheet".
+    Returns:
+        str: Path of the written snapshot, or None when `snapshot_format = none`.
+    Example:
+        >>> write_snapshot(df, "first_excel_sheet_path", "first_excel_sheet")
+        '.../first_excel_sheet/first_excel_sheet_2025-04-11.parquet'
+    """
+
+    writer = open_snapshot_writer(path_option, sheet_name)
+    writer.write(df)
+    return writer.close()
+
+
+def tee_snapshot(frames, path_option, sheet_name):
+
+    """
+    Passes chunks through to the next stage while writing them to the stage's snapshot.
+    The snapshot is closed once the chunks are exhausted (or the consumer stops early).
+    Args:
+        frames (iterable): DataFrame chunks.
+        path_option (str): `[file_paths]` option naming the folder.
+        sheet_name (str): File name prefix.
+    Yields:
+        pd.DataFrame: The same chunks.
+    """
+
+    writer = open_snapshot_writer(path_option, sheet_name)
+    try:
+        for df in frames:
+            writer.write(df)
+            yield df
+    finally:
+        writer.close()
+
+
+def load_snapshot(data):
+
+    """
+    Returns the rows handed to a stage as a DataFrame.
+    Args:
+        data (pd.DataFrame | str): The previous stage's DataFrame, or the path of an
+            archived snapshot (.parquet or .xlsx) when a stage is rerun by hand.
+    Returns:
+        pd.DataFrame: The rows. Excel snapshots are read as text so that
+        `order_no`/`iec` values keep their leading zeros and are not turned into floats.
+    """
+
+    import pandas as pd
+
+    if isinstance(data, pd.DataFrame):
+        return data
+    if str(data).lower().endswith(".parquet"):
+        return pd.read_parquet(data)
+    return pd.read_excel(data, dtype=str)
+
+
+def iter_frames(data, chunk_rows=None):
+
+    """
+    Yields the rows handed to a stage as DataFrame chunks of at most `chunk_rows` rows.
+    Args:
+        data: A DataFrame, a snapshot path (.parquet or .xlsx), or an iterable of
+            DataFrame chunks from the previous stage.
+        chunk_rows (int, optional): Maximum rows per chunk (see `memory_budget`).
+            None yields whole frames, as `load_snapshot` would.
+    Yields:
+        pd.DataFrame: The chunks, in order.
+    """
+
+    import pandas as pd
+
+    if isinstance(data, (str, os.PathLike)):
+        if not chunk_rows:
+            yield load_snapshot(data)
+        elif str(data).lower().endswith(".parquet"):
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(data).iter_batches(batch_size=chunk_rows):
+                yield batch.to_pandas()
+        else:
+            from functions import snapshot_diff
+            yield from snapshot_diff.iter_xlsx_chunks(data, chunk_rows)
+        return
+
+    frames = [data] if isinstance(data, pd.DataFrame) else data
+    for df in frames:
+        if not chunk_rows or len(df) <= chunk_rows:
+            yield df
+            continue
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows].copy()
+
+
+class FrameBuffer:
+
+    """
+    Collects the chunks one stage produces for the next stage.
+    Chunks are kept in memory, or spooled to a Parquet file when a spool path is
+    given, so in chunked mode a large result never has to fit in memory.
+    Args:
+        spool_path (str, optional): Parquet file to spool the chunks to.
+    """
+
+    def __init__(self, spool_path=None):
+        self.spool_path = spool_path
+        self.rows = 0
+        self._frames = []
+        self._writer = None
+        if spool_path:
+            os.makedirs(os.path.dirname(spool_path) or ".", exist_ok=True)
+            self._writer = SnapshotWriter(spool_path, "parquet")
+
+    def write(self, df):
+
+        """Adds one chunk (empty chunks are skipped)."""
+
+        if df.empty:
+            return
+        self.rows += len(df)
+        if self._writer:
+            self._writer.write(df)
+        else:
+            self._frames.append(df)
+
+    def frames(self):
+
+        """
+        Returns the collected rows for the next stage.
+        Returns:
+            A DataFrame when held in memory, or the spool file path to read back in chunks.
+        """
+
+        if self._writer:
+            self._writer.close()
+            return self.spool_path
+
+        import pandas as pd
+        if not self._frames:
+            return pd.DataFrame()
+        return pd.concat(self._frames, ignore_index=True) if len(self._frames) > 1 else self._frames[0]
@@ -0,0 +1,325 @@
+import os
+import re
+import json
+import glob
+import shutil
+import argparse
+import configparser
+from datetime import datetime
+
+from functions import order_keys, order_schema
+
+
+# pandas/pyarrow are imported where they are used so that importing the scraper stays cheap
+
+MANIFEST_NAME = "manifest.json"
+PARTITION_FIELD = "snapshot_date"
+
+
+def get_archive_dir(sheet_name):
+
+    """Returns the dataset directory of one snapshot kind, e.g. data/archive/first_excel_sheet."""
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    return os.path.join(config.get('archive', 'archive_path', fallback=os.path.join('data', 'archive')), sheet_name)
+
+
+def load_manifest(archive_dir):
+
+    """
+    Reads the manifest of an archived dataset.
+    Returns:
+        dict: {"partitions": {snapshot_date: {"rows", "scraped_rows", "bytes", "files"}}}.
+    """
+
+    manifest_path = os.path.join(archive_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {"partitions": {}}
+    with open(manifest_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(archive_dir, manifest):
+
+    """Writes the manifest atomically, so a crash never leaves it half written."""
+
+    manifest_path = os.path.join(archive_dir, MANIFEST_NAME)
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def open_dataset(archive_dir):
+
+    """
+    Opens the hive-partitioned dataset (`snapshot_date=YYYY-MM-DD/`) under `archive_dir`.
+    The dataset schema is the union of every part file's schema, not just the first
+    one found, so columns added later (e.g. `order_date_value`) can be selected and
+    filtered on; partitions written before they existed read them as nulls.
+    """
+
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    partition_schema = pa.schema([(PARTITION_FIELD, pa.string())])
+    partitioning = ds.partitioning(partition_schema, flavor="hive")
+    dataset = ds.dataset(archive_dir, format="parquet", partitioning=partitioning, exclude_invalid_files=True)
+
+    schemas = [fragment.physical_schema for fragment in dataset.get_fragments()] + [partition_schema]
+    try:
+        schema = pa.unify_schemas(schemas, promote_options="permissive")
+    except TypeError:
+        # pyarrow < 14 has no type promotion
+        schema = pa.unify_schemas(schemas)
+    return ds.dataset(archive_dir, schema=schema, format="parquet", partitioning=partitioning, exclude_invalid_files=True)
+
+
+def prepare_rows(df):
+
+    """
+    Returns a copy of `df` with database column names, the explicit order schema
+    and the `key_hash`/`content_hash` fingerprints, the form every archived
+    partition is stored in. The schema is applied before hashing, as in
+    `check_increment_data`, so archived fingerprints match the live ones.
+    """
+
+    df = order_keys.normalise_columns(df.copy())
+    df = df.drop(columns=[column for column in df.columns if column.startswith("unnamed:")])
+    order_schema.apply_schema(df)
+    df['key_hash'] = order_keys.key_fingerprint(df)
+    df['content_hash'] = order_keys.content_fingerprint(df)
+    return df
+
+
+class ArchiveWriter:
+
+    """
+    Adds one day's rows to the compressed, date-partitioned Parquet archive, one
+    DataFrame chunk at a time.
+    Only rows whose (key_hash, content_hash) pair is not already archived are
+    stored, so an order is archived on the day it first appeared and again only
+    when its details change. Rows are sorted by the key columns within each part
+    file, which keeps the row-group statistics tight for predicate pushdown in
+    `query_archive`. Rows are only compared with the partitions of earlier dates,
+    so dates can be backfilled in any order. The part files are written to a
+    temporary folder and swapped in by `close`, so archiving a date twice replaces
+    that date's partition, and a run that dies part-way keeps the old one.
+    Args:
+        sheet_name (str): Snapshot kind, e.g. "first_excel_sheet".
+        snapshot_date (str, optional): "YYYY-MM-DD". Defaults to today.
+    """
+
+    def __init__(self, sheet_name, snapshot_date=None):
+        self.sheet_name = sheet_name
+        self.snapshot_date = snapshot_date or datetime.now().strftime("%Y-%m-%d")
+        self.archive_dir = get_archive_dir(sheet_name)
+        self.partition = f"{PARTITION_FIELD}={self.snapshot_date}"
+        self.rows_archived = 0
+        self.rows_scraped = 0
+        self.files = []
+        self.size = 0
+
+        # Skipped by dataset discovery (leading "_") until `close` renames it
+        self.temp_dir = os.path.join(self.archive_dir, f"_writing_{self.partition}")
+        if os.path.isdir(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+        os.makedirs(self.temp_dir)
+
+        self.manifest = load_manifest(self.archive_dir)
+        self.manifest["partitions"].pop(self.snapshot_date, None)
+        self.seen = set()
+        if any(date < self.snapshot_date for date in self.manifest["partitions"]):
+            import pyarrow.dataset as ds
+            seen = open_dataset(self.archive_dir).to_table(
+                columns=['key_hash', 'content_hash'], filter=ds.field(PARTITION_FIELD) < self.snapshot_date,
+            )
+            self.seen = set(zip(seen.column('key_hash').to_pylist(), seen.column('content_hash').to_pylist()))
+
+    def write(self, df):
+
+        """Archives the rows of one chunk that have not been archived before."""
+
+        config = configparser.ConfigParser()
+        config.read('config.ini')
+
+        self.rows_scraped += len(df)
+        rows = prepare_rows(df).drop_duplicates(subset=['key_hash', 'content_hash'])
+        pairs = list(zip(rows['key_hash'], rows['content_hash']))
+        rows = rows[[pair not in self.seen for pair in pairs]]
+        if rows.empty:
+            return
+        self.seen.update(zip(rows['key_hash'], rows['content_hash']))
+
+        sort_columns = [column for column in order_keys.KEY_COLUMNS if column in rows.columns]
+        rows = rows.sort_values(sort_columns, kind="stable")
+        rows = order_schema.to_storage(rows)
+
+        part_name = f"part-{len(self.files)}.parquet"
+        file_name = os.path.join(self.partition, part_name)
+        file_path = os.path.join(self.temp_dir, part_name)
+        rows.to_parquet(
+            file_path, index=False,
+            compression=config.get('archive', 'compression', fallback='zstd'),
+            row_group_size=config.getint('archive', 'row_group_size', fallback=50000),
+        )
+        self.files.append(file_name)
+        self.size += os.path.getsize(file_path)
+        self.rows_archived += len(rows)
+
+    def close(self):
+
+        """
+        Swaps the new partition in place of the old one and records it in the manifest.
+        Returns:
+            int: Number of rows stored in the partition.
+        """
+
+        partition_dir = os.path.join(self.archive_dir, self.partition)
+        replaced_dir = os.path.join(self.archive_dir, f"_replaced_{self.partition}")
+        if os.path.isdir(replaced_dir):
+            shutil.rmtree(replaced_dir)
+        if os.path.isdir(partition_dir):
+            os.replace(partition_dir, replaced_dir)
+        os.replace(self.temp_dir, partition_dir)
+        if os.path.isdir(replaced_dir):
+            shutil.rmtree(replaced_dir)
+
+        self.manifest["partitions"][self.snapshot_date] = {
+            "rows": self.rows_archived,
+            "scraped_rows": self.rows_scraped,
+            "bytes": self.size,
+            "files": self.files,
+        }
+        save_manifest(self.archive_dir, self.manifest)
+        print(f"Archived {self.rows_archived} of {self.rows_scraped} {self.sheet_name} rows "
+              f"for {self.snapshot_date} ({self.size / 1024:.1f} KiB)")
+        return self.rows_archived
+
+
+def archive_snapshot(df, sheet_name, snapshot_date=None):
+
+    """
+    Adds one day's rows to the archive in one go (see `ArchiveWriter`).
+    Args:
+        df (pd.DataFrame): The stage's rows (raw headers or database column names).
+        sheet_name (str): Snapshot kind, e.g. "first_excel_sheet".
+        snapshot_date (str, optional): "YYYY-MM-DD". Defaults to today.
+    Returns:
+        int: Number of rows stored in the partition.
+    """
+
+    writer = ArchiveWriter(sheet_name, snapshot_date)
+    writer.write(df)
+    return writer.close()
+
+
+def query_archive(sheet_name, start_date=None, end_date=None, filters=None, columns=None):
+
+    """
+    Scans the archive for a date range with filters pushed down to Parquet.
+    Partitions outside [start_date, end_date] are pruned by directory name, and
+    equality filters on the key columns skip row groups by their statistics.
+    Args:
+        sheet_name (str): Snapshot kind, e.g. "first_excel_sheet".
+        start_date (str, optional): First "YYYY-MM-DD" to scan.
+        end_date (str, optional): Last "YYYY-MM-DD" to scan.
+        filters (dict, optional): Column -> value, or column -> list of values.
+        columns (list, optional): Columns to read. `snapshot_date` is always included.
+    Returns:
+        pd.DataFrame: Matching rows ordered by `snapshot_date`.
+    Example:
+        >>> query_archive("first_excel_sheet", filters={"order_no": "04/21/021/00123/AM22"})
+    """
+
+    import pyarrow.dataset as ds
+
+    archive_dir = get_archive_dir(sheet_name)
+    if not load_manifest(archive_dir)["partitions"]:
+        import pandas as pd
+        return pd.DataFrame(columns=(columns or []) + [PARTITION_FIELD])
+
+    expression = None
+    conditions = []
+    if start_date:
+        conditions.append(ds.field(PARTITION_FIELD) >= start_date)
+    if end_date:
+        conditions.append(ds.field(PARTITION_FIELD) <= end_date)
+    for column, value in (filters or {}).items():
+        if isinstance(value, (list, tuple, set)):
+            conditions.append(ds.field(column).isin(list(value)))
+        else:
+            conditions.append(ds.field(column) == value)
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+
+    if columns:
+        columns = list(dict.fromkeys(list(columns) + [PARTITION_FIELD]))
+    table = open_dataset(archive_dir).to_table(columns=columns, filter=expression)
+    return table.to_pandas().sort_values(PARTITION_FIELD, kind="stable").reset_index(drop=True)
+
+
+def first_seen(sheet_name, **key):
+
+    """
+    Returns the date an order first appeared in the archive.
+    Args:
+        sheet_name (str): Snapshot kind, e.g. "first_excel_sheet".
+        **key: Key column values, e.g. order_no="...", order_type="...".
+    Returns:
+        str: "YYYY-MM-DD", or None if the order was never archived.
+    """
+
+    found = query_archive(sheet_name, filters=key, columns=list(key))
+    return found[PARTITION_FIELD].iloc[0] if len(found) else None
+
+
+def import_snapshots(sheet_name, paths):
+
+    """
+    Backfills the archive from existing dated snapshot files, oldest first.
+    The date is taken from the file name, e.g. first_excel_sheet_2025-04-11.xlsx.
+    Args:
+        sheet_name (str): Snapshot kind, e.g. "first_excel_sheet".
+        paths (list): Snapshot files (.xlsx or .parquet); glob patterns are expanded.
+    Returns:
+        int: Number of snapshots imported.
+    """
+
+    from functions import snapshot
+
+    dated = []
+    for pattern in paths:
+        for path in glob.glob(pattern) or [pattern]:
+            match = re.search(r"(\d{4}-\d{2}-\d{2})", os.path.basename(path))
+            if not match:
+                print(f"Skipping {path}: no date in the file name")
+                continue
+            dated.append((match.group(1), path))
+
+    for snapshot_date, path in sorted(dated):
+        archive_snapshot(snapshot.load_snapshot(path), sheet_name, snapshot_date)
+    return len(dated)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Import or query the partitioned snapshot archive")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="backfill the archive from dated snapshot files")
+    import_parser.add_argument("sheet_name", help="e.g. first_excel_sheet")
+    import_parser.add_argument("paths", nargs="+", help="snapshot files or glob patterns")
+
+    query_parser = commands.add_parser("query", help="print archived rows matching the filters")
+    query_parser.add_argument("sheet_name", help="e.g. first_excel_sheet")
+    query_parser.add_argument("--start-date")
+    query_parser.add_argument("--end-date")
+    query_parser.add_argument("--where", action="append", default=[], metavar="COLUMN=VALUE")
+    query_parser.add_argument("--columns", nargs="+")
+
+    args = arg_parser.parse_args()
+    if args.command == "import":
+        print(f"{import_snapshots(args.sheet_name, args.paths)} snapshots imported")
+    else:
+        where = dict(condition.split("=", 1) for condition in args.where)
+        print(query_archive(args.sheet_name, args.start_date, args.end_date, where, args.columns).to_string())
@@ -0,0 +1,232 @@
+import os
+import csv
+import time
+import argparse
+import configparser
+
+from functions import order_keys, order_schema
+
+
+# pandas/pyarrow/openpyxl are imported where they are used so that importing stays cheap
+
+DB_SOURCE = "db"
+
+
+def iter_xlsx_chunks(path, chunk_rows):
+
+    """Streams an Excel snapshot in DataFrames of `chunk_rows` rows (openpyxl read-only mode)."""
+
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = [str(header) for header in next(rows)]
+        chunk = []
+        for row in rows:
+            chunk.append(["" if value is None else str(value) for value in row])
+            if len(chunk) >= chunk_rows:
+                yield pd.DataFrame(chunk, columns=headers)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=headers)
+    finally:
+        workbook.close()
+
+
+def iter_parquet_chunks(path, chunk_rows):
+
+    """Streams a Parquet snapshot in record batches of `chunk_rows` rows."""
+
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+        yield batch.to_pandas()
+
+
+def iter_db_chunks(chunk_rows):
+
+    """
+    Streams the active orders of the live table, read-only.
+    The stored `key_hash`/`content_hash` are used where present; orders stored
+    before the fingerprints existed, or a table without the columns, are hashed
+    from their columns in `iter_snapshot_chunks`.
+    """
+
+    import pandas as pd
+    from functions import db_connection
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    connection = db_connection.db_connection()
+    try:
+        existing = order_keys.table_columns(connection)
+        columns = [column for column in order_keys.KEY_COLUMNS + order_keys.CONTENT_COLUMNS + ['key_hash', 'content_hash']
+                   if column in existing]
+        query = f"SELECT {', '.join(columns)} FROM {config['general']['table_name']}"
+        if "removal_date" in existing:
+            query += " WHERE removal_date IS NULL"
+        cursor = connection.cursor()
+        cursor.execute(query)
+        while True:
+            batch = cursor.fetchmany(chunk_rows)
+            if not batch:
+                break
+            yield pd.DataFrame(batch, columns=columns)
+        cursor.close()
+    finally:
+        connection.close()
+
+
+def iter_snapshot_chunks(source, chunk_rows=50000):
+
+    """
+    Streams a snapshot as fingerprinted chunks.
+    Args:
+        source (str): An .xlsx or .parquet snapshot path, or "db" for the live table.
+        chunk_rows (int): Rows per chunk.
+    Yields:
+        pd.DataFrame: Chunks with database column names, `key_hash` and `content_hash`.
+    """
+
+    if source == DB_SOURCE:
+        chunks = iter_db_chunks(chunk_rows)
+    elif source.lower().endswith(".parquet"):
+        chunks = iter_parquet_chunks(source, chunk_rows)
+    else:
+        chunks = iter_xlsx_chunks(source, chunk_rows)
+
+    for chunk in chunks:
+        order_keys.normalise_columns(chunk)
+        order_schema.apply_schema(chunk)
+        if 'key_hash' not in chunk.columns or chunk['key_hash'].isna().any():
+            chunk['key_hash'] = order_keys.key_fingerprint(chunk)
+        if 'content_hash' not in chunk.columns:
+            chunk['content_hash'] = order_keys.content_fingerprint(chunk)
+        elif chunk['content_hash'].isna().any():
+            missing = chunk['content_hash'].isna()
+            chunk.loc[missing, 'content_hash'] = order_keys.content_fingerprint(chunk[missing])
+        yield chunk
+
+
+def load_orders(source, chunk_rows):
+
+    """
+    Reads a snapshot into key_hash -> (set of content_hashes, key values).
+    The composite key is not unique (distinct orders can share it), so every
+    distinct content fingerprint listed under a key is kept.
+    Args:
+        source (str): An .xlsx or .parquet snapshot path, or "db" for the live table.
+        chunk_rows (int): Rows per streamed chunk.
+    Returns:
+        dict: The orders of the snapshot.
+    """
+
+    orders = {}
+    for chunk in iter_snapshot_chunks(source, chunk_rows):
+        keys = chunk.reindex(columns=order_keys.KEY_COLUMNS)
+        keys = keys.astype(object).where(keys.notna(), None)
+        for key_hash, content_hash, key in zip(chunk['key_hash'], chunk['content_hash'], keys.itertuples(index=False, name=None)):
+            if key_hash in orders:
+                orders[key_hash][0].add(content_hash)
+            else:
+                orders[key_hash] = ({content_hash}, key)
+    return orders
+
+
+def compare_contents(old_contents, new_contents):
+
+    """
+    Compares the distinct details listed under one key on both sides.
+    Details present on both sides are unchanged; the others are paired off as
+    changed orders, and what is left over is added or removed.
+    Args:
+        old_contents (set): Content fingerprints in the old snapshot (empty when the key is new).
+        new_contents (set): Content fingerprints in the new snapshot (empty when the key is gone).
+    Returns:
+        dict: Counts of "added", "removed", "changed" and "unchanged" orders for the key.
+    """
+
+    unchanged = len(old_contents & new_contents)
+    old_only = len(old_contents) - unchanged
+    new_only = len(new_contents) - unchanged
+    changed = min(old_only, new_only)
+    return {"added": new_only - changed, "removed": old_only - changed, "changed": changed, "unchanged": unchanged}
+
+
+def diff_snapshots(old_source, new_source, output_path=None, chunk_rows=50000):
+
+    """
+    Compares two snapshots by composite key and reports added, removed and changed orders.
+    Each side is read chunk by chunk into key_hash -> (distinct content_hashes, key
+    values), so memory grows with the number of orders, not with the columns.
+    Orders are compared per key as sets of content fingerprints (see
+    `compare_contents`), so keys shared by several orders give the same result
+    whatever order the rows come in.
+    Args:
+        old_source (str): Old snapshot (.xlsx, .parquet or "db").
+        new_source (str): New snapshot (.xlsx, .parquet or "db").
+        output_path (str, optional): CSV file listing every added, removed and changed order.
+        chunk_rows (int): Rows per streamed chunk.
+    Returns:
+        dict: Counts of "added", "removed", "changed" and "unchanged" orders and the
+        seconds spent in each phase under "timings".
+    Example:
+        >>> diff_snapshots("first_excel_sheet_2025-04-10.xlsx", "first_excel_sheet_2025-04-11.parquet")
+    """
+
+    print("diff_snapshots function is called")
+
+    timings = {}
+    started = time.perf_counter()
+    old_orders = load_orders(old_source, chunk_rows)
+    timings["load_old"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    new_orders = load_orders(new_source, chunk_rows)
+    timings["load_new"] = time.perf_counter() - started
+
+    writer = None
+    output_file = None
+    if output_path:
+        output_file = open(output_path, "w", newline="", encoding="utf-8")
+        writer = csv.writer(output_file)
+        writer.writerow(["change"] + order_keys.KEY_COLUMNS + ["key_hash"])
+
+    counts = {"added": 0, "removed": 0, "changed": 0, "unchanged": 0}
+    try:
+        started = time.perf_counter()
+        # Old snapshot order first, then the keys only the new snapshot has
+        for key_hash in [*old_orders, *(key_hash for key_hash in new_orders if key_hash not in old_orders)]:
+            old_contents, key = old_orders.get(key_hash, (set(), None))
+            new_contents, new_key = new_orders.get(key_hash, (set(), None))
+            key = key or new_key
+            for change, count in compare_contents(old_contents, new_contents).items():
+                counts[change] += count
+                if writer and change != "unchanged":
+                    for _ in range(count):
+                        writer.writerow([change, *key, key_hash])
+        timings["compare"] = time.perf_counter() - started
+    finally:
+        if output_file:
+            output_file.close()
+
+    print(f"{old_source} -> {new_source}: {counts['added']} added, {counts['removed']} removed, "
+          f"{counts['changed']} changed, {counts['unchanged']} unchanged")
+    for phase, seconds in timings.items():
+        print(f"{phase:12s} {seconds:8.2f}s")
+    if output_path:
+        print(f"Differences saved to {os.path.abspath(output_path)}")
+    return {**counts, "timings": timings}
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Diff two order snapshots (.xlsx, .parquet or db) by composite key")
+    arg_parser.add_argument("old", help="old snapshot path, or 'db' for the live table")
+    arg_parser.add_argument("new", help="new snapshot path, or 'db' for the live table")
+    arg_parser.add_argument("--output", help="CSV file listing every added, removed and changed order")
+    arg_parser.add_argument("--chunk-rows", type=int, default=50000)
+    args = arg_parser.parse_args()
+    diff_snapshots(args.old, args.new, args.output, args.chunk_rows)
@@ -0,0 +1,146 @@
+import time
+import argparse
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+except ImportError:  # lxml is optional, BeautifulSoup is used without it
+    lxml = None
+
+
+def parse_table_lxml(table_html):
+
+    """
+    Parses the metaTable HTML with lxml's C parser.
+    Args:
+        table_html (str): The table's outerHTML.
+    Returns:
+        tuple: (headers, table_data). Rows hold the text of every cell but the last,
+               followed by the href of the last cell's link or "No Link".
+    """
+
+    table = lxml.html.fragment_fromstring(table_html, create_parent=False)
+    rows = table.xpath(".//tr")
+    if not rows:
+        return [], []
+
+    headers = [th.text_content().strip() for th in rows[0].xpath("./th")]
+    table_data = []
+    for row in rows[1:]:
+        columns = row.xpath("./td")
+        row_data = [col.text_content().strip() for col in columns[:-1]]
+        hrefs = columns[-1].xpath(".//a/@href") if columns else []
+        row_data.append(hrefs[0] if hrefs else "No Link")
+        table_data.append(row_data)
+    return headers, table_data
+
+
+def parse_table_bs4(html):
+
+    """
+    Parses the first table in `html` with BeautifulSoup's html.parser.
+    This is the original extraction path and works on either the full page
+    source or just the table's outerHTML.
+    Args:
+        html (str): Page source or table HTML.
+    Returns:
+        tuple: (headers, table_data) in the same format as `parse_table_lxml`.
+    """
+
+    soup = BeautifulSoup(html, 'html.parser')
+    table = soup.find("table")
+    rows = table.find_all("tr")
+
+    headers = [col.text.strip() for col in rows[0].find_all("th")]
+    table_data = []
+    for row in rows[1:]:
+        columns = row.find_all("td")
+        row_data = [col.text.strip() for col in columns[:-1]]
+        link = columns[-1].find("a") if columns else None
+        row_data.append(link["href"] if link else "No Link")
+        table_data.append(row_data)
+    return headers, table_data
+
+
+def parse_table_html(table_html, parser="lxml"):
+
+    """
+    Parses the metaTable outerHTML into headers and rows.
+    Args:
+        table_html (str): The table's outerHTML.
+        parser (str): "lxml" (default) or "bs4". lxml falls back to bs4 when it
+                      is not installed.
+    Returns:
+        tuple: (headers, table_data).
+    """
+
+    if parser == "lxml" and lxml is not None:
+        return parse_table_lxml(table_html)
+    return parse_table_bs4(table_html)
+
+
+def extract_table_html(page_source, table_id="metaTable"):
+
+    """
+    Cuts the `<table id="metaTable">` element out of a recorded page source.
+    Used by the benchmark to feed the targeted parsers the same input the
+    browser's outerHTML would give them.
+    """
+
+    soup = BeautifulSoup(page_source, 'html.parser')
+    table = soup.find("table", id=table_id) or soup.find("table")
+    return str(table)
+
+
+def benchmark_parsers(html_paths, repeat=5):
+
+    """
+    Compares the full-page BeautifulSoup path with the targeted metaTable parsers.
+    Each recorded page is parsed `repeat` times by:
+        - bs4_full_page: BeautifulSoup over the whole page source (original path)
+        - bs4_table: BeautifulSoup over just the table outerHTML
+        - lxml_table: lxml over just the table outerHTML
+    Args:
+        html_paths (list): Paths of recorded page sources.
+        repeat (int): Number of timed runs per page and parser.
+    Returns:
+        dict: Mean seconds per page for each parser.
+    """
+
+    pages = []
+    for path in html_paths:
+        with open(path, encoding="utf-8") as f:
+            page_source = f.read()
+        pages.append((page_source, extract_table_html(page_source)))
+
+    parsers = {
+        "bs4_full_page": lambda page, table: parse_table_bs4(page),
+        "bs4_table": lambda page, table: parse_table_bs4(table),
+    }
+    if lxml is not None:
+        parsers["lxml_table"] = lambda page, table: parse_table_lxml(table)
+
+    reference = [parse_table_bs4(page) for page, _ in pages]
+    results = {}
+    for name, parse in parsers.items():
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for index, (page, table) in enumerate(pages):
+                parsed = parse(page, table)
+                if parsed != reference[index]:
+                    raise Exception(f"{name} output differs from bs4_full_page on {html_paths[index]}")
+        results[name] = (time.perf_counter() - started) / (repeat * len(pages))
+
+    baseline = results["bs4_full_page"]
+    for name, seconds in results.items():
+        print(f"{name:15s} {seconds * 1000:9.2f} ms/page  {baseline / seconds:6.1f}x")
+    return results
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark metaTable parsers on recorded pages")
+    arg_parser.add_argument("pages", nargs="+", help="recorded page_source HTML files")
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+    benchmark_parsers(args.pages, args.repeat)
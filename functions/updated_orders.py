@@ -0,0 +1,287 @@
+import configparser
+from collections import Counter
+
+from functions import order_keys
+import log_details
+
+
+# Stands in for the content_hash of a key stored on more than one row
+DUPLICATE_KEY = "duplicate key"
+
+
+def fetch_content_hashes(connection):
+
+    """
+    Fetches the stored content fingerprint of every order, including those marked
+    removed, so an order that is listed again with edited details is updated
+    as well as revived (see `deleted_orders.revive_orders`).
+    Args:
+        connection: An open MySQL connection.
+    Returns:
+        dict: key_hash -> content_hash (None when the order has no fingerprint yet,
+              `DUPLICATE_KEY` when several rows share the composite key).
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    cursor = connection.cursor()
+    cursor.execute(
+        f"SELECT key_hash, content_hash FROM {config['general']['table_name']} "
+        "WHERE key_hash IS NOT NULL"
+    )
+    content_hashes = {}
+    while True:
+        batch = cursor.fetchmany(order_keys.FETCH_BATCH_SIZE)
+        if not batch:
+            break
+        for key_hash, content_hash in batch:
+            content_hashes[key_hash] = DUPLICATE_KEY if key_hash in content_hashes else content_hash
+    cursor.close()
+    return content_hashes
+
+
+def repeated_keys(scraped_rows):
+
+    """
+    Returns the keys scraped with more than one set of details.
+    Args:
+        scraped_rows (set): (key_hash, content_hash) pairs of the whole scrape.
+    Returns:
+        set: Key fingerprints shared by distinct orders on the website.
+    """
+
+    counts = Counter(key_hash for key_hash, content_hash in scraped_rows)
+    return {key_hash for key_hash, count in counts.items() if count > 1}
+
+
+def find_update_candidates(excel_df, content_hashes):
+
+    """
+    Returns the scraped rows of orders stored on exactly one row whose content
+    fingerprint differs from the stored one or was never recorded. Chunked runs
+    collect these per chunk and pass them to `detect_updated_orders` once the
+    whole listing is known.
+    Args:
+        excel_df (pd.DataFrame): Scraped rows with `key_hash` and `content_hash` columns.
+        content_hashes (dict): From `load_content_hashes`.
+    """
+
+    stored = excel_df['key_hash'].map(content_hashes)
+    known = excel_df['key_hash'].isin(content_hashes.keys()) & (stored != DUPLICATE_KEY)
+    return excel_df[known & (stored != excel_df['content_hash'])]
+
+
+def find_updated_rows(excel_df, content_hashes, ambiguous_keys=None):
+
+    """
+    Splits the scraped rows of existing orders by how their content fingerprint
+    compares with the stored one.
+    The composite key is not unique: distinct orders can share it. A key is only
+    considered when it maps to exactly one row in the database and to one set
+    of details in the scrape; otherwise there is no telling which order changed.
+    Args:
+        excel_df (pd.DataFrame): Scraped rows with `key_hash` and `content_hash` columns.
+        content_hashes (dict): From `load_content_hashes`.
+        ambiguous_keys (set, optional): Keys repeated elsewhere in the scrape (see `repeated_keys`).
+    Returns:
+        tuple: (updated, unhashed) frames. `updated` holds rows whose details differ
+               from the database; `unhashed` holds rows of orders stored before
+               content fingerprints existed, which only need the fingerprint recorded.
+    """
+
+    existing = find_update_candidates(excel_df, content_hashes)
+    variants = existing.groupby('key_hash')['content_hash'].transform('nunique')
+    existing = existing[variants == 1]
+    if ambiguous_keys:
+        existing = existing[~existing['key_hash'].isin(ambiguous_keys)]
+    existing = existing.drop_duplicates(subset=['key_hash'])
+    stored = existing['key_hash'].map(content_hashes)
+
+    unhashed = existing[stored.isna()]
+    updated = existing[stored.notna()]
+    return updated, unhashed
+
+
+def fetch_attachments(connection, key_hashes, batch_size=1000):
+
+    """
+    Fetches the stored attachment URL of the given orders.
+    Args:
+        connection: An open MySQL connection.
+        key_hashes (list): Key fingerprints to look up.
+        batch_size (int): Keys per query.
+    Returns:
+        dict: key_hash -> attachment.
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    attachments = {}
+    cursor = connection.cursor()
+    for start in range(0, len(key_hashes), batch_size):
+        batch = key_hashes[start:start + batch_size]
+        cursor.execute(
+            f"SELECT key_hash, attachment FROM {config['general']['table_name']} "
+            f"WHERE key_hash IN ({', '.join(['%s'] * len(batch))})",
+            tuple(batch),
+        )
+        attachments.update(cursor.fetchall())
+    cursor.close()
+    return attachments
+
+
+def download_changed_attachments(connection, updated):
+
+    """
+    Downloads the new PDF of every updated order whose attachment URL changed, into
+    the same year/month layout as new orders (`download_pdf.plan_pdf_paths`).
+    Args:
+        connection: An open MySQL connection.
+        updated (pd.DataFrame): Rows whose details changed on the website.
+    Returns:
+        dict: key_hash -> (pdf_name, pdf_path) for the rows whose attachment changed;
+              both are None when the new PDF could not be downloaded (it is spooled
+              for the next run, see `failed_downloads`).
+    """
+
+    if updated.empty:
+        return {}
+
+    stored = fetch_attachments(connection, updated['key_hash'].tolist())
+    attachments = updated['attachment'].astype(object).where(updated['attachment'].notna(), "")
+    stored_attachments = updated['key_hash'].map(stored).astype(object).where(lambda values: values.notna(), "")
+    changed = updated[attachments != stored_attachments].reset_index(drop=True)
+    if changed.empty:
+        return {}
+
+    from functions import download_pdf, pdf_downloader, pdf_store, failed_downloads
+
+    print(f"Attachments changed on the website: {len(changed)}")
+    download_folder = download_pdf.get_download_folder()
+    plan = download_pdf.plan_pdf_paths(changed, download_folder)
+    results = pdf_downloader.download_planned(plan, store=pdf_store.get_store(download_folder))
+    failed_downloads.record_failed_downloads(changed, plan, results)
+    return {changed.at[index, 'key_hash']: results.get(index, (None, None)) for index in changed.index}
+
+
+def apply_updates(connection, updated, unhashed, batch_size=1000, pdf_files=None):
+
+    """
+    Writes corrected order details back in batched UPDATEs inside one transaction.
+    Args:
+        connection: An open MySQL connection.
+        updated (pd.DataFrame): Rows whose details changed on the website.
+        unhashed (pd.DataFrame): Rows that only need their content_hash recorded.
+        batch_size (int): Rows per executemany batch.
+        pdf_files (dict, optional): key_hash -> (pdf_name, pdf_path) for rows whose
+            attachment changed (see `download_changed_attachments`); these rows get
+            their pdf_name and pdf_path updated in the same statement.
+    Returns:
+        int: Number of orders whose details were updated.
+    Raises:
+        Exception: If any UPDATE fails; the whole transaction is rolled back first.
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    table_name = config['general']['table_name']
+
+    assignments = ", ".join(f"{column} = %s" for column in order_keys.CONTENT_COLUMNS)
+    update_query = f"UPDATE {table_name} SET {assignments}, content_hash = %s WHERE key_hash = %s"
+    pdf_update_query = (f"UPDATE {table_name} SET {assignments}, content_hash = %s, pdf_name = %s, pdf_path = %s "
+                        "WHERE key_hash = %s")
+    baseline_query = f"UPDATE {table_name} SET content_hash = %s WHERE key_hash = %s AND content_hash IS NULL"
+    pdf_files = pdf_files or {}
+
+    import pandas as pd
+
+    update_values = []
+    pdf_update_values = []
+    for row in updated.to_dict('records'):
+        values = [row.get(column) for column in order_keys.CONTENT_COLUMNS]
+        values = [None if pd.isna(value) else value for value in values]  # NaN/NA -> NULL
+        if row['key_hash'] in pdf_files:
+            pdf_update_values.append((*values, row['content_hash'], *pdf_files[row['key_hash']], row['key_hash']))
+        else:
+            update_values.append((*values, row['content_hash'], row['key_hash']))
+    baseline_values = list(zip(unhashed['content_hash'], unhashed['key_hash']))
+
+    cursor = connection.cursor()
+    try:
+        for query, values in ((update_query, update_values), (pdf_update_query, pdf_update_values),
+                              (baseline_query, baseline_values)):
+            for start in range(0, len(values), batch_size):
+                cursor.executemany(query, values[start:start + batch_size])
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return len(update_values) + len(pdf_update_values)
+
+
+def load_content_hashes(connection):
+
+    """
+    Fetches the stored content fingerprints (the `content_hash` column comes with
+    `order_keys.ensure_key_hash_column`), so chunked runs fetch them once for all chunks.
+    Args:
+        connection: An open MySQL connection.
+    Returns:
+        dict: key_hash -> content_hash of the orders ({} when `[updates] enabled` is off).
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    if not config.getboolean('updates', 'enabled', fallback=True):
+        return {}
+    return fetch_content_hashes(connection)
+
+
+def detect_updated_orders(connection, excel_df, content_hashes=None, scraped_rows=None):
+
+    """
+    Finds orders whose details were edited on the website and applies the corrections.
+    Only rows whose `content_hash` differs from the stored one, and whose key
+    identifies a single order (see `find_updated_rows`), are updated; the
+    count is added to `log_details.updated_count` for the log table.
+    Args:
+        connection: An open MySQL connection.
+        excel_df (pd.DataFrame): Scraped rows (or the `find_update_candidates` of every
+            chunk) with `key_hash` and `content_hash` columns.
+        content_hashes (dict, optional): From `load_content_hashes`; fetched when omitted.
+            It is kept up to date with the fingerprints written here.
+        scraped_rows (set, optional): (key_hash, content_hash) pairs of the whole scrape,
+            when `excel_df` is only part of it.
+    Returns:
+        int: Number of orders updated.
+    """
+
+    print("detect_updated_orders function is called")
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    if not config.getboolean('updates', 'enabled', fallback=True):
+        return 0
+
+    if excel_df.empty:
+        return 0
+    if content_hashes is None:
+        content_hashes = load_content_hashes(connection)
+    ambiguous_keys = repeated_keys(scraped_rows) if scraped_rows is not None else None
+    updated, unhashed = find_updated_rows(excel_df, content_hashes, ambiguous_keys)
+    print(f"Rows changed on the website (Updated Data): {len(updated)}")
+    if updated.empty and unhashed.empty:
+        return 0
+
+    pdf_files = download_changed_attachments(connection, updated)
+    count = apply_updates(connection, updated, unhashed, config.getint('updates', 'batch_size', fallback=1000), pdf_files)
+    for rows in (updated, unhashed):
+        content_hashes.update(zip(rows['key_hash'], rows['content_hash']))
+    log_details.updated_count += count
+    return count
@@ -0,0 +1,130 @@
+import time
+import configparser
+
+
+# Every wait made during the run, as (name, seconds waited, succeeded)
+wait_timings = []
+
+
+def get_timeout(name, fallback):
+
+    """
+    Reads a wait timeout (in seconds) from the `[waits]` section of config.ini.
+    Args:
+        name (str): The option name, e.g. "draw_timeout".
+        fallback (float): Value used when the option is not configured.
+    Returns:
+        float: The timeout in seconds.
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    return config.getfloat('waits', name, fallback=fallback)
+
+
+def timed_wait(name, condition, driver, timeout):
+
+    """
+    Blocks until `condition(driver)` returns a truthy value or `timeout` expires,
+    and records how long the wait actually took.
+    Args:
+        name (str): Label recorded in `wait_timings`.
+        condition (callable): Called with the driver until it returns a truthy value.
+        driver (WebDriver): The Selenium driver.
+        timeout (float): Maximum seconds to wait.
+    Returns:
+        The truthy value returned by `condition`.
+    Raises:
+        TimeoutException: If the condition is not met within `timeout`.
+    """
+
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.common.exceptions import TimeoutException
+
+    started = time.perf_counter()
+    try:
+        result = WebDriverWait(driver, timeout, poll_frequency=get_timeout('poll_frequency', 0.2)).until(condition)
+        wait_timings.append((name, time.perf_counter() - started, True))
+        return result
+    except TimeoutException:
+        wait_timings.append((name, time.perf_counter() - started, False))
+        raise
+
+
+def wait_for_document_ready(driver, timeout=None):
+
+    """Waits until `document.readyState` is "complete"."""
+
+    timeout = timeout or get_timeout('page_load_timeout', 30)
+    return timed_wait(
+        "document_ready",
+        lambda d: d.execute_script("return document.readyState") == "complete",
+        driver, timeout,
+    )
+
+
+def wait_for_table_ready(driver, timeout=None):
+
+    """
+    Waits until the metaTable has been initialised by DataTables and its body has rows.
+    Returns:
+        int: The number of rows held by the DataTables instance.
+    """
+
+    timeout = timeout or get_timeout('table_ready_timeout', 60)
+    return timed_wait(
+        "table_ready",
+        lambda d: d.execute_script("""
+            if (!window.jQuery || !$.fn.dataTable || !$.fn.dataTable.isDataTable('#metaTable')) {
+                return 0;
+            }
+            return $('#metaTable tbody tr').length > 0 ? $('#metaTable').DataTable().rows().count() : 0;
+        """),
+        driver, timeout,
+    )
+
+
+def draw_page_and_wait(driver, zero_indexed_page, timeout=None):
+
+    """
+    Moves the metaTable to a page and blocks until DataTables has drawn it.
+    A one-off `draw.dt` handler is registered before `page(n).draw(false)` is
+    called, so the wait ends as soon as the table is redrawn rather than after a
+    fixed sleep. Only the event counts: `page(n)` updates `page.info()` at once,
+    before an ajax/serverSide table has fetched the new rows.
+    Args:
+        driver (WebDriver): The Selenium driver.
+        zero_indexed_page (int): DataTables page index (0-based).
+        timeout (float, optional): Seconds to wait. Defaults to `[waits] draw_timeout`.
+    Raises:
+        TimeoutException: If the page is not drawn within the timeout.
+    """
+
+    timeout = timeout or get_timeout('draw_timeout', 15)
+    driver.execute_script("""
+        window.__metaTableDrawn = false;
+        var table = $('#metaTable').DataTable();
+        $('#metaTable').one('draw.dt', function () { window.__metaTableDrawn = true; });
+        table.page(arguments[0]).draw(false);
+    """, zero_indexed_page)
+
+    timed_wait(
+        "page_draw",
+        lambda d: d.execute_script("return window.__metaTableDrawn === true")
+        and d.execute_script("return $('#metaTable tbody tr').length") > 0,
+        driver, timeout,
+    )
+
+
+def print_wait_summary():
+
+    """Prints the count, total and slowest time of every kind of wait made so far."""
+
+    summary = {}
+    for name, elapsed, ok in wait_timings:
+        count, total, slowest, timeouts = summary.get(name, (0, 0.0, 0.0, 0))
+        summary[name] = (count + 1, total + elapsed, max(slowest, elapsed), timeouts + (not ok))
+
+    for name, (count, total, slowest, timeouts) in summary.items():
+        print(f"wait {name}: {count} waits, {total:.1f}s total, "
+              f"{total / count:.2f}s avg, {slowest:.2f}s max, {timeouts} timeouts")
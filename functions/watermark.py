@@ -0,0 +1,173 @@
+import os
+import json
+import configparser
+from datetime import datetime
+
+from functions import db_connection, order_keys
+
+
+# Registers a date-aware ordering for the Order Date column (the site shows
+# DD/MM/YYYY text, which DataTables would otherwise sort as a plain string)
+# and sorts the table newest first.
+SORT_NEWEST_FIRST_JS = """
+    var header = arguments[0];
+    var table = $('#metaTable').DataTable();
+    var index = -1;
+    $('#metaTable thead tr:first th').each(function (i) {
+        if ($(this).text().trim().toLowerCase() === header.toLowerCase()) { index = i; }
+    });
+    if (index === -1) { return -1; }
+
+    $.fn.dataTable.ext.order['dgft-date'] = function (settings, col) {
+        return this.api().column(col, {order: 'index'}).nodes().map(function (td) {
+            var text = $(td).text().trim();
+            var m = text.match(/^(\\d{1,2})\\/(\\d{1,2})\\/(\\d{4})/);
+            if (m) { return parseInt(m[3] + ('0' + m[2]).slice(-2) + ('0' + m[1]).slice(-2), 10); }
+            m = text.match(/^(\\d{4})-(\\d{1,2})-(\\d{1,2})/);
+            if (m) { return parseInt(m[1] + ('0' + m[2]).slice(-2) + ('0' + m[3]).slice(-2), 10); }
+            return 0;
+        });
+    };
+    table.settings()[0].aoColumns[index].sSortDataType = 'dgft-date';
+    table.order([index, 'desc']).draw();
+    return index;
+"""
+
+
+def normalise_header(header):
+
+    """Converts a table header to its database column name, e.g. "RA File No" -> "ra_file_no"."""
+
+    return header.strip().lower().replace(' ', '_').replace('.', '')
+
+
+def get_known_keys():
+
+    """
+    Fetches the key fingerprints of every order already in the database.
+    Returns:
+        set: `order_keys` fingerprints of the stored orders.
+    """
+
+    print("get_known_keys function is called")
+
+    connection = db_connection.db_connection()
+    try:
+        order_keys.ensure_key_hash_column(connection)
+        return order_keys.fetch_key_hashes(connection)
+    finally:
+        connection.close()
+
+
+class KnownRowWatermark:
+
+    """
+    Tracks runs of already-known rows while a newest-first listing is paged.
+    Args:
+        known_keys (set): Key fingerprints already in the database.
+        stop_after (int): Consecutive known rows after which paging can stop.
+    """
+
+    def __init__(self, known_keys, stop_after):
+        self.known_keys = known_keys
+        self.stop_after = stop_after
+        self.consecutive_known = 0
+        self.rows_seen = 0
+
+    def observe(self, headers, rows):
+
+        """
+        Feeds one page of rows to the watermark.
+        Args:
+            headers (list): Table headers of the page.
+            rows (list): The page's rows.
+        Returns:
+            bool: True once `stop_after` consecutive known rows have been seen.
+        """
+
+        columns = [normalise_header(header) for header in headers]
+        positions = [columns.index(key) for key in order_keys.KEY_COLUMNS]
+        for row in rows:
+            key = order_keys.fingerprint_key(row[position] for position in positions)
+            self.consecutive_known = self.consecutive_known + 1 if key in self.known_keys else 0
+            self.rows_seen += 1
+        return self.consecutive_known >= self.stop_after
+
+
+def get_state_path():
+
+    """Returns the path of the file recording the last full crawl."""
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    return config.get('incremental', 'state_path', fallback=os.path.join('data', 'spool', 'incremental_state.json'))
+
+
+def is_full_crawl_due():
+
+    """
+    Decides whether this run must crawl the whole listing.
+    A full crawl is due when `[incremental] crawl_mode` is "full", when no full
+    crawl has been recorded yet, or when the last one is at least
+    `full_crawl_every_days` old. Full crawls are what catch deletions.
+    Returns:
+        bool: True if the run should not stop early.
+    """
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    if config.get('incremental', 'crawl_mode', fallback='full') != "incremental":
+        return True
+
+    state_path = get_state_path()
+    if not os.path.exists(state_path):
+        print("No full crawl recorded yet, running a full crawl")
+        return True
+
+    with open(state_path, encoding="utf-8") as f:
+        last_full_crawl = datetime.strptime(json.load(f)["last_full_crawl"], "%Y-%m-%d")
+
+    age_days = (datetime.now() - last_full_crawl).days
+    if age_days >= config.getint('incremental', 'full_crawl_every_days', fallback=7):
+        print(f"Last full crawl was {age_days} days ago, running a full crawl")
+        return True
+    return False
+
+
+def record_full_crawl():
+
+    """Stores today's date as the date of the last full crawl."""
+
+    state_path = get_state_path()
+    os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump({"last_full_crawl": datetime.now().strftime("%Y-%m-%d")}, f)
+
+
+def start_incremental_crawl(driver):
+
+    """
+    Prepares an early-stopping crawl if one is allowed for this run.
+    Sorts the metaTable newest first by the configured date column and loads
+    the known keys from the database.
+    Args:
+        driver (WebDriver): The driver showing the listing.
+    Returns:
+        KnownRowWatermark: The watermark to feed pages to, or None for a full crawl.
+    """
+
+    if is_full_crawl_due():
+        return None
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    order_column = config.get('incremental', 'order_date_header', fallback='Order Date')
+    if driver.execute_script(SORT_NEWEST_FIRST_JS, order_column) == -1:
+        print(f"Column '{order_column}' not found, running a full crawl")
+        return None
+
+    stop_after = config.getint('incremental', 'stop_after_known_rows', fallback=50)
+    print(f"Incremental crawl: newest first by '{order_column}', stopping after {stop_after} known rows")
+    return KnownRowWatermark(get_known_keys(), stop_after)
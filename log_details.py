@@ -3,8 +3,6 @@ import configparser
 config = configparser.ConfigParser()
 config.read('config.ini')
 
-print("Config Sections:", config.sections())
-
 
 source_status = config['general']['source_status']
 table_name = config['general']['table_name']
@@ -14,8 +12,13 @@ source_name = config['general']['source_name']
 log_list = [None] * 8
 no_data_avaliable = 0
 no_data_scraped = 0
-# updated_count = 0
+updated_count = 0
 newly_added_count = 0
 deleted_source = ""
 deleted_source_count = 0
+# False when an incremental crawl stopped early, so the snapshot is not the whole listing
+full_crawl = True
 
+# Attachment download retries and failures in this run (see download_session)
+pdf_download_retries = 0
+pdf_download_failures = 0
@@ -1,8 +1,10 @@
 
 import sys
+import argparse
 import traceback
+import configparser
 import log_details
-from functions import extract_all_data_in_website,log,check_increment_data
+from functions import log
 
 """
 RAS SEZ incremental Data Extraction
@@ -26,7 +28,7 @@ Data points to collect:
 """
 
 
-def main():
+def main(replay_stage=None, snapshot_path=None):
 
     """
     Main execution module for RAS SEZ Historical data extraction.
@@ -34,7 +36,9 @@ def main():
     It orchestrates the data extraction process and handles different states of the source system.
     Dependencies:
         - log_details: Contains source status and logging information
-        - extract_all_data_in_website: Module for data extraction
+        - extract_all_data_in_website: Module for data extraction (Selenium backend)
+        - http_scraper: Browserless data extraction (`[scraper] backend = http`)
+        - replay: Reruns the diff, download or insert stage from a snapshot (`--replay`)
         - log: Module for logging operations
         - sys: For system operations and exit handling
         - traceback: For exception handling
@@ -42,6 +46,10 @@ def main():
         - Active: Proceeds with data extraction
         - Hibernated: Logs status and exits
         - Inactive: Logs status, clears log list and exits
+    Args:
+        replay_stage (str, optional): "diff", "download" or "insert" to rerun that stage
+            from a snapshot instead of scraping (`python main.py --replay <stage> [snapshot]`).
+        snapshot_path (str, optional): Snapshot to replay from. Defaults to the newest one.
     Returns:
         None
     Raises:
@@ -70,9 +78,20 @@ def main():
  
     if log_details.source_status == "Active":
 
-        extract_all_data_in_website.extract_all_data_in_website()
-        # excel_path = r"C:\Users\Premkumar.8265\Desktop\ras_sez_historical\data\first_excel_sheet\first_excel_sheet_2025-04-11.xlsx"
-        # check_increment_data.check_increment_data(excel_path)
+        config = configparser.ConfigParser()
+        config.read('config.ini')
+
+        # Scraper backends pull in selenium/pandas, so only import the one in use
+        if replay_stage:
+            # Replays never import selenium or start the browser
+            from functions import replay
+            replay.replay(replay_stage, snapshot_path)
+        elif config.get('scraper', 'backend', fallback='selenium') == "http":
+            from functions import http_scraper
+            http_scraper.extract_all_data_in_website()
+        else:
+            from functions import extract_all_data_in_website
+            extract_all_data_in_website.extract_all_data_in_website()
      
         print("finsihed")
 
@@ -107,4 +126,17 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    from functions.replay import REPLAY_STAGES
+
+    arg_parser = argparse.ArgumentParser(description="RAS SEZ incremental data extraction")
+    arg_parser.add_argument("--replay", nargs="+", metavar=("STAGE", "SNAPSHOT"),
+                            help=f"rerun a stage ({', '.join(REPLAY_STAGES)}) from a snapshot, "
+                                 "optionally naming the snapshot, instead of scraping")
+    args = arg_parser.parse_args()
+
+    if args.replay:
+        if args.replay[0] not in REPLAY_STAGES or len(args.replay) > 2:
+            arg_parser.error(f"--replay expects a stage ({', '.join(REPLAY_STAGES)}) and an optional snapshot path")
+        main(args.replay[0], args.replay[1] if len(args.replay) > 1 else None)
+    else:
+        main()
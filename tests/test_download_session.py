@@ -0,0 +1,39 @@
+import unittest
+
+import requests
+
+from functions.download_session import RetryPolicy
+
+
+class FakeResponse:
+
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class RetryPolicyTest(unittest.TestCase):
+
+    def test_transient_errors_are_retried(self):
+        policy = RetryPolicy(max_retries=2, backoff_base=0.5)
+        for error in (TimeoutError("took longer than 300s"), requests.exceptions.ConnectionError(),
+                      requests.exceptions.ChunkedEncodingError(), requests.exceptions.ReadTimeout()):
+            self.assertIsNotNone(policy.retry_delay(0, error=error), error)
+        self.assertIsNone(policy.retry_delay(0, error=ValueError("not transient")))
+
+    def test_retryable_statuses_back_off_until_max_retries(self):
+        policy = RetryPolicy(max_retries=2, backoff_base=0.5, backoff_max=1.0)
+        self.assertLessEqual(policy.retry_delay(0, response=FakeResponse(503)), 0.5)
+        self.assertLessEqual(policy.retry_delay(1, response=FakeResponse(500)), 1.0)
+        self.assertIsNone(policy.retry_delay(2, response=FakeResponse(503)))
+        self.assertIsNone(policy.retry_delay(0, response=FakeResponse(404)))
+        self.assertEqual(policy.retries, 2)
+
+    def test_retry_after_is_honoured(self):
+        policy = RetryPolicy(retry_after_max=10)
+        self.assertEqual(policy.retry_delay(0, response=FakeResponse(429, {"Retry-After": "7"})), 7)
+        self.assertEqual(policy.retry_delay(0, response=FakeResponse(429, {"Retry-After": "600"})), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import json
+import threading
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from functions import http_scraper
+
+
+HEADERS = ["Sr.No", "RA File No", "Order Date", "Unit Name", "Order"]
+
+LISTING_PAGE = """
+<html><body>
+<table id="metaTable">
+  <thead><tr><th>Sr.No</th><th>RA File No</th><th>Order Date</th><th>Unit Name</th><th>Order</th></tr></thead>
+  <tbody><tr><td colspan="5">No data available in table</td></tr></tbody>
+</table>
+</body></html>
+"""
+
+# Object rows with the fields in a different order than the table columns
+RECORDS = [
+    {
+        "order": f'<a href="/orders/{number}.pdf">View</a>',
+        "unit_name": f"Unit {number}",
+        "ra_file_no": f"RA/{number}",
+        "order_date": "01/01/2024",
+        "sr_no": str(number),
+    }
+    for number in range(1, 24)
+]
+
+
+class ListingHandler(BaseHTTPRequestHandler):
+
+    """
+    Stand-in DGFT listing: "/" serves the page with an empty `#metaTable` and
+    "/data" answers like DataTables server-side processing, honouring
+    draw/start/length. Every request's query is appended to `server.queries`.
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/data":
+            self.send_body(LISTING_PAGE.encode(), "text/html")
+            return
+
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.server.queries.append(query)
+        start, length = int(query.get("start", 0)), int(query.get("length", 10))
+        payload = {
+            "draw": int(query.get("draw", 0)),
+            "recordsTotal": len(RECORDS),
+            "recordsFiltered": len(RECORDS),
+            "data": RECORDS[start:start + length],
+        }
+        self.send_body(json.dumps(payload).encode(), "application/json")
+
+    def send_body(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FetchRowsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), ListingHandler)
+        self.server.queries = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        self.session = http_scraper.create_http_session()
+
+    def tearDown(self):
+        self.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_pages_through_the_server_side_endpoint(self):
+        headers, table_data = http_scraper.fetch_rows(
+            self.session, listing_url=f"{self.base_url}/", data_endpoint=f"{self.base_url}/data", timeout=5, page_size=10,
+        )
+
+        self.assertEqual(headers, HEADERS)
+        self.assertEqual(len(table_data), len(RECORDS))
+        self.assertEqual([query["start"] for query in self.server.queries], ["0", "10", "20"])
+        self.assertEqual([query["draw"] for query in self.server.queries], ["1", "2", "3"])
+
+    def test_object_rows_are_mapped_to_the_headers_by_name(self):
+        headers, table_data = http_scraper.fetch_rows(
+            self.session, listing_url=f"{self.base_url}/", data_endpoint=f"{self.base_url}/data", timeout=5, page_size=10,
+        )
+
+        self.assertEqual(table_data[0], ["1", "RA/1", "01/01/2024", "Unit 1", "/orders/1.pdf"])
+        self.assertEqual(table_data[-1], ["23", "RA/23", "01/01/2024", "Unit 23", "/orders/23.pdf"])
+
+
+class ParseListingJsonTest(unittest.TestCase):
+
+    def test_list_rows_keep_their_column_order(self):
+        payload = {"data": [["1", "RA/1", "01/01/2024", "Unit 1", '<a href="/orders/1.pdf">View</a>']]}
+        self.assertEqual(http_scraper.parse_listing_json(payload, HEADERS),
+                         [["1", "RA/1", "01/01/2024", "Unit 1", "/orders/1.pdf"]])
+
+    def test_missing_fields_are_left_empty(self):
+        payload = [{"RA File No": "RA/1", "Order": None}]
+        self.assertEqual(http_scraper.parse_listing_json(payload, HEADERS),
+                         [["", "RA/1", "", "", "No Link"]])
+
+    def test_plain_cells_skip_the_html_parser(self):
+        payload = [[1, " RA/1 ", "M &amp; S Exports", "<b>Unit 1</b>", "No link here"]]
+        with mock.patch.object(http_scraper, "BeautifulSoup", wraps=http_scraper.BeautifulSoup) as parser:
+            rows = http_scraper.parse_listing_json(payload, HEADERS)
+        self.assertEqual(rows, [["1", "RA/1", "M & S Exports", "Unit 1", "No Link"]])
+        self.assertEqual(parser.call_count, 2)
+
+    def test_unrelated_fields_are_rejected(self):
+        with self.assertRaises(Exception):
+            http_scraper.parse_listing_json([{"foo": "1", "bar": "2"}], HEADERS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+import os
+import re
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from functions import pdf_downloader
+from functions.download_session import RetryPolicy
+
+
+BODY = b"%PDF-1.4\n" + bytes(range(256)) * 400
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+
+    """
+    Stand-in attachment server with Range/If-Range support.
+    The test controls it through `server.state`:
+        body, etag   - the file and its validator
+        ranges       - honour Range requests (False answers 200 with the whole body)
+        cut_after    - send only this many body bytes, then drop the connection
+    Every request's (Range, If-Range) headers are appended to `server.state["requests"]`.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        state = self.server.state
+        body = state["body"]
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        state["requests"].append((range_header, if_range))
+
+        start = 0
+        if state["ranges"] and range_header and if_range in (None, state["etag"]):
+            start = int(re.match(r"bytes=(\d+)-", range_header).group(1))
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        else:
+            self.send_response(200)
+
+        content = body[start:]
+        self.send_header("Content-Length", str(len(content)))
+        self.send_header("ETag", state["etag"])
+        if state["ranges"]:
+            self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+
+        if state["cut_after"] is not None:
+            self.wfile.write(content[:state["cut_after"]])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(content)
+
+
+class ResumableDownloadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+        self.server.state = {"body": BODY, "etag": '"v1"', "ranges": True, "cut_after": None, "requests": []}
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/12345/order.pdf"
+
+        self.folder = tempfile.mkdtemp()
+        self.local_path = os.path.join(self.folder, "12345_order.pdf")
+        self.part_path = pdf_downloader.get_part_path(self.url, self.local_path)
+        self.settings = {
+            "connect_timeout": 5, "read_timeout": 5, "file_timeout": 30,
+            "chunk_size": 1024, "resume": True,
+        }
+        self.session = requests.Session()
+
+    def tearDown(self):
+        self.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.folder)
+
+    def download(self):
+        return pdf_downloader.download_file(
+            self.url, self.local_path, self.settings, self.session, policy=RetryPolicy(max_retries=0),
+            limiter=pdf_downloader.HostRateLimiter(rate=1000, burst=1000),
+        )
+
+    def interrupted_download(self, cut_after):
+        self.server.state["cut_after"] = cut_after
+        self.assertIsNotNone(self.download())
+        self.server.state["cut_after"] = None
+        self.server.state["requests"].clear()
+        self.assertFalse(os.path.exists(self.local_path))
+        return os.path.getsize(self.part_path)
+
+    def assert_complete(self, body):
+        with open(self.local_path, "rb") as pdf_file:
+            self.assertEqual(pdf_file.read(), body)
+        self.assertFalse(os.path.exists(self.part_path))
+        self.assertFalse(os.path.exists(f"{self.part_path}.json"))
+
+    def test_interrupted_download_resumes_with_range(self):
+        received = self.interrupted_download(cut_after=40000)
+        self.assertGreater(received, 0)
+        with open(f"{self.part_path}.json") as sidecar_file:
+            sidecar = json.load(sidecar_file)
+        self.assertEqual(sidecar["url"], self.url)
+        self.assertEqual(sidecar["etag"], '"v1"')
+
+        self.assertIsNone(self.download())
+
+        self.assertEqual(self.server.state["requests"], [(f"bytes={received}-", '"v1"')])
+        self.assert_complete(BODY)
+
+    def test_repeated_interruptions_resume_from_the_latest_byte(self):
+        first = self.interrupted_download(cut_after=20000)
+        second = self.interrupted_download(cut_after=20000)
+        self.assertGreater(second, first)
+
+        self.assertIsNone(self.download())
+        self.assert_complete(BODY)
+
+    def test_changed_file_restarts_from_the_first_byte(self):
+        self.interrupted_download(cut_after=40000)
+        new_body = b"%PDF-1.5\n" + b"changed" * 10000
+        self.server.state.update(body=new_body, etag='"v2"')
+
+        self.assertIsNone(self.download())
+
+        # If-Range did not match, so the server answered 200 with the new file
+        self.assertEqual(len(self.server.state["requests"]), 1)
+        self.assert_complete(new_body)
+
+    def test_server_without_range_support_restarts(self):
+        self.interrupted_download(cut_after=40000)
+        self.server.state["ranges"] = False
+
+        self.assertIsNone(self.download())
+
+        self.assert_complete(BODY)
+
+    def test_range_past_the_end_restarts(self):
+        # A complete .part file left behind before it could be renamed
+        with open(self.part_path, "wb") as part_file:
+            part_file.write(BODY)
+        pdf_downloader.save_partial(self.part_path, {"url": self.url, "bytes": len(BODY), "etag": '"v1"', "last_modified": None})
+
+        self.assertIsNone(self.download())
+
+        self.assertEqual(self.server.state["requests"], [(f"bytes={len(BODY)}-", '"v1"'), (None, None)])
+        self.assert_complete(BODY)
+
+    def test_unreachable_server_keeps_the_partial_download(self):
+        received = self.interrupted_download(cut_after=40000)
+        with open(f"{self.part_path}.json") as sidecar_file:
+            sidecar = sidecar_file.read()
+        self.server.shutdown()
+        self.server.server_close()
+
+        self.assertIsNotNone(self.download())
+
+        self.assertEqual(os.path.getsize(self.part_path), received)
+        with open(f"{self.part_path}.json") as sidecar_file:
+            self.assertEqual(sidecar_file.read(), sidecar)
+        self.assertFalse(os.path.exists(self.local_path))
+
+    def test_urls_with_the_same_file_name_use_separate_part_files(self):
+        other_url = self.url.replace("/12345/", "/67890/")
+        self.assertNotEqual(pdf_downloader.get_part_path(other_url, self.local_path), self.part_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from functions import snapshot_diff
+
+
+def snapshot(*rows):
+    return pd.DataFrame([
+        {"Order Type": "RA", "Order No": order_no, "Name of Party": party, "RA File No": "RA/1",
+         "Office": "Mumbai", "Order Date": order_date, "Category": "", "IEC": "", "Issued By": "",
+         "Text of Order": "", "Attachment": f"/orders/{order_no}-{order_date}.pdf"}
+        for order_no, party, order_date in rows
+    ])
+
+
+class DiffSnapshotsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def diff(self, old, new):
+        old_path, new_path = os.path.join(self.folder, "old.parquet"), os.path.join(self.folder, "new.parquet")
+        old.to_parquet(old_path)
+        new.to_parquet(new_path)
+        counts = snapshot_diff.diff_snapshots(old_path, new_path)
+        counts.pop("timings")
+        return counts
+
+    def test_duplicate_keys_do_not_depend_on_row_order(self):
+        rows = [("1", "GEM GRANITES", "01/01/2024"), ("1", "GEM GRANITES", "02/01/2024"), ("2", "MEGHNA DIAMOND", "01/01/2024")]
+        counts = self.diff(snapshot(*rows), snapshot(*reversed(rows)))
+        self.assertEqual(counts, {"added": 0, "removed": 0, "changed": 0, "unchanged": 3})
+
+    def test_changed_added_and_removed_orders_under_a_shared_key(self):
+        old = snapshot(("1", "GEM GRANITES", "01/01/2024"), ("1", "GEM GRANITES", "02/01/2024"))
+        new = snapshot(("1", "GEM GRANITES", "01/01/2024"), ("1", "GEM GRANITES", "03/01/2024"),
+                       ("1", "GEM GRANITES", "04/01/2024"))
+        counts = self.diff(old, new)
+        self.assertEqual(counts, {"added": 1, "removed": 0, "changed": 1, "unchanged": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+import log_details
+from functions import order_keys, updated_orders
+
+
+def scraped(*rows):
+    df = pd.DataFrame([
+        {"order_type": "RA", "order_no": order_no, "name_of_party": party, "ra_file_no": "RA/1",
+         "office": "Mumbai", "order_date": order_date, "category": "", "iec": "", "issued_by": "",
+         "text_of_order": "", "attachment": f"/orders/{order_no}-{order_date}.pdf"}
+        for order_no, party, order_date in rows
+    ])
+    df['key_hash'] = order_keys.key_fingerprint(df)
+    df['content_hash'] = order_keys.content_fingerprint(df)
+    return df
+
+
+class FakeCursor:
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, params=()):
+        self.rows = [row for row in self.connection.rows if "content_hash" in query]
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchall(self):
+        return self.fetchmany(0)
+
+    def executemany(self, query, values):
+        self.connection.updates.extend((query, value) for value in values)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+
+    """Orders table holding `rows` as (key_hash, content_hash); UPDATEs are recorded in `updates`."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.updates = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class DuplicateKeyTest(unittest.TestCase):
+
+    def setUp(self):
+        log_details.updated_count = 0
+        self.stored = scraped(("1", "GEM GRANITES", "01/01/2024"), ("2", "MEGHNA DIAMOND", "01/01/2024"))
+
+    def detect(self, connection, excel_df):
+        content_hashes = updated_orders.load_content_hashes(connection)
+        candidates = updated_orders.find_update_candidates(excel_df, content_hashes)
+        pairs = set(zip(excel_df['key_hash'], excel_df['content_hash']))
+        return updated_orders.detect_updated_orders(connection, candidates, content_hashes, pairs)
+
+    def test_a_changed_order_with_a_unique_key_is_updated(self):
+        connection = FakeConnection(list(zip(self.stored['key_hash'], self.stored['content_hash'])))
+        excel_df = scraped(("1", "GEM GRANITES", "02/01/2024"), ("2", "MEGHNA DIAMOND", "01/01/2024"))
+
+        with mock.patch.object(updated_orders, "download_changed_attachments", return_value={}):
+            self.assertEqual(self.detect(connection, excel_df), 1)
+        self.assertEqual([value[-1] for query, value in connection.updates], [excel_df.at[0, 'key_hash']])
+
+    def test_a_key_stored_on_several_rows_is_not_updated(self):
+        stored = list(zip(self.stored['key_hash'], self.stored['content_hash']))
+        other = scraped(("1", "GEM GRANITES", "05/05/2023"))
+        connection = FakeConnection(stored + [(other.at[0, 'key_hash'], other.at[0, 'content_hash'])])
+        excel_df = scraped(("1", "GEM GRANITES", "02/01/2024"), ("2", "MEGHNA DIAMOND", "01/01/2024"))
+
+        self.assertEqual(self.detect(connection, excel_df), 0)
+        self.assertEqual(connection.updates, [])
+
+    def test_a_key_scraped_with_several_variants_is_not_updated(self):
+        connection = FakeConnection(list(zip(self.stored['key_hash'], self.stored['content_hash'])))
+        excel_df = scraped(("1", "GEM GRANITES", "01/01/2024"), ("1", "GEM GRANITES", "02/01/2024"),
+                           ("2", "MEGHNA DIAMOND", "01/01/2024"))
+
+        self.assertEqual(self.detect(connection, excel_df), 0)
+        self.assertEqual(connection.updates, [])
+
+    def test_variants_split_across_chunks_are_not_updated(self):
+        connection = FakeConnection(list(zip(self.stored['key_hash'], self.stored['content_hash'])))
+        first_chunk = scraped(("1", "GEM GRANITES", "02/01/2024"))
+        second_chunk = scraped(("1", "GEM GRANITES", "03/01/2024"))
+
+        content_hashes = updated_orders.load_content_hashes(connection)
+        candidates = pd.concat([updated_orders.find_update_candidates(chunk, content_hashes)
+                                for chunk in (first_chunk, second_chunk)])
+        pairs = {(row.key_hash, row.content_hash) for chunk in (first_chunk, second_chunk) for row in chunk.itertuples()}
+        self.assertEqual(updated_orders.detect_updated_orders(connection, candidates, content_hashes, pairs), 0)
+        self.assertEqual(connection.updates, [])
+
+
+if __name__ == "__main__":
+    unittest.main()